@@ -0,0 +1,12 @@
+"""
+OceanFront query gateway
+- Async orchestration of LLM planning, data queries and model predictions
+- Pluggable LLM providers (Groq, local mock)
+"""
+
+from .data import ModelQueryExecutor, ProfileQueryExecutor, model_executors
+from .llm import GroqLLMProvider, LLMProvider, MockLLMProvider
+from .orchestrator import QueryOrchestrator
+
+__all__ = ["GroqLLMProvider", "LLMProvider", "MockLLMProvider", "ModelQueryExecutor", "ProfileQueryExecutor",
+           "QueryOrchestrator", "model_executors"]
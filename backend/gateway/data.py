@@ -0,0 +1,105 @@
+"""
+Data-layer executors for query plans
+- Filters a ProfileStore by region / month / year once per profile, then aggregates levels with NumPy
+- Model predictions are scored once for the whole store at startup and aggregated the same way per plan
+"""
+
+import numpy as np
+import pandas as pd
+
+from pipeline.argo import MEASUREMENTS
+
+AGGREGATES = {"mean": np.nanmean, "min": np.nanmin, "max": np.nanmax}
+
+
+class ProfileQueryExecutor:
+    """Callable(plan) → {"variable", "aggregate", "value", "n_profiles", "n_levels"} over a ProfileStore."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def profile_mask(self, plan: dict) -> np.ndarray:
+        meta = self.store.meta
+        mask = np.ones(len(self.store), dtype=bool)
+        region = plan.get("region")
+        if region:
+            lat_min, lat_max, lon_min, lon_max = region
+            lat, lon = meta["latitude"], meta["longitude"]
+            mask &= (lat >= lat_min) & (lat <= lat_max)
+            # A box crossing the antimeridian has lon_min > lon_max
+            in_lon = (lon >= lon_min) & (lon <= lon_max) if lon_min <= lon_max else (lon >= lon_min) | (lon <= lon_max)
+            mask &= in_lon
+        if (plan.get("month") or plan.get("year")) and "date_time" in meta:
+            times = pd.DatetimeIndex(meta["date_time"])
+            if plan.get("month"):
+                mask &= times.month == int(plan["month"])
+            if plan.get("year"):
+                mask &= times.year == int(plan["year"])
+        return mask
+
+    def __call__(self, plan: dict) -> dict:
+        variable = plan.get("variable", "temperature")
+        # The plan comes from the LLM; only level measurements may be read off the store
+        if variable not in MEASUREMENTS:
+            raise ValueError(f"Unknown variable {variable!r}; expected one of {list(MEASUREMENTS)}")
+        aggregate = plan.get("aggregate", "mean")
+        profiles = self.profile_mask(plan)
+        levels = np.repeat(profiles, self.store.lengths)
+        values = getattr(self.store, variable)[levels]
+
+        if aggregate == "count" or not values.size or np.isnan(values).all():
+            value = None if aggregate != "count" else int(profiles.sum())
+        else:
+            value = round(float(AGGREGATES.get(aggregate, np.nanmean)(values)), 3)
+        return {
+            "variable": variable,
+            "aggregate": aggregate,
+            "value": value,
+            "n_profiles": int(profiles.sum()),
+            "n_levels": int(values.size),
+        }
+
+
+class ModelQueryExecutor:
+    """
+    Callable(plan) → {"model", "aggregate", "value", "n_profiles", "n_values"} for one ensemble model.
+    result: an EnsembleResult over the executor's whole store (pipeline.ensemble), scored once;
+    the plan's region / month / year select which predictions are aggregated.
+    """
+
+    def __init__(self, data: ProfileQueryExecutor, result, name: str):
+        self.data = data
+        self.name = name
+        if name in result.levels:
+            self.values, self.per_level = result.levels[name].to_numpy(), True
+        else:
+            self.values, self.per_level = result.profiles[name].to_numpy(), False
+
+    def __call__(self, plan: dict) -> dict:
+        aggregate = plan.get("aggregate", "mean")
+        profiles = self.data.profile_mask(plan)
+        rows = np.repeat(profiles, self.data.store.lengths) if self.per_level else profiles
+        values = self.values[rows]
+        if not values.size or np.isnan(values).all():
+            value = None
+        else:
+            value = round(float(AGGREGATES.get(aggregate, np.nanmean)(values)), 3)
+        return {
+            "model": self.name,
+            "aggregate": aggregate if aggregate in AGGREGATES else "mean",
+            "value": value,
+            "n_profiles": int(profiles.sum()),
+            "n_values": int(np.count_nonzero(~np.isnan(values))),
+        }
+
+
+def model_executors(data: ProfileQueryExecutor, engine) -> dict:
+    """{name: ModelQueryExecutor} for every model in an EnsembleEngine that scored the store."""
+    from pipeline.ensemble import SharedFeatures
+
+    if not engine.models:
+        return {}
+    # The store is already QC-filtered, so featurize it directly instead of engine.featurize
+    features = SharedFeatures(data.store, engine.mld_threshold, engine.ref_depth)
+    result = engine.predict(features)
+    return {name: ModelQueryExecutor(data, result, name) for name in engine.models if name not in result.errors}
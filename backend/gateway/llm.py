@@ -0,0 +1,140 @@
+"""
+Pluggable LLM providers for the query gateway
+- LLMProvider: plan(question) → query plan dict, answer(question, results) → streamed text
+- MockLLMProvider: deterministic keyword parser for local runs and tests (no network)
+- GroqLLMProvider: same interface over the Groq chat API (the provider the frontend uses)
+"""
+
+import asyncio
+import json
+import os
+import re
+from abc import ABC, abstractmethod
+
+# Rough bounding boxes (lat_min, lat_max, lon_min, lon_max) for region names in questions
+REGIONS = {
+    "indian ocean": (-60.0, 30.0, 20.0, 147.0),
+    "arabian sea": (0.0, 25.0, 50.0, 78.0),
+    "bay of bengal": (5.0, 23.0, 78.0, 100.0),
+    "southern ocean": (-90.0, -60.0, -180.0, 180.0),
+    "pacific": (-60.0, 60.0, 120.0, -70.0),
+    "atlantic": (-60.0, 60.0, -70.0, 20.0),
+}
+MONTHS = ["january", "february", "march", "april", "may", "june", "july",
+          "august", "september", "october", "november", "december"]
+VARIABLES = {"temperature": "temperature", "temp": "temperature", "salinity": "salinity", "depth": "depth"}
+MODEL_KEYWORDS = {
+    "tz": ("temperature profile", "predict temperature", "forecast temperature", "tz"),
+    "mld": ("mixed layer", "mld"),
+    "max_depth": ("max depth", "maximum depth", "how deep"),
+}
+
+PLAN_PROMPT = """You turn ocean-data questions into JSON query plans. Reply with JSON only:
+{"variable": "temperature|salinity|depth", "aggregate": "mean|min|max|count",
+ "region": [lat_min, lat_max, lon_min, lon_max] or null, "month": 1-12 or null, "year": YYYY or null,
+ "models": subset of ["tz", "mld", "max_depth"]}"""
+
+
+class LLMProvider(ABC):
+    """Interface the orchestrator talks to; implementations must be safe to call concurrently."""
+
+    @abstractmethod
+    async def plan(self, question: str) -> dict:
+        """Natural-language question → query plan (see PLAN_PROMPT for the keys)."""
+
+    @abstractmethod
+    async def answer(self, question: str, results: dict):
+        """Async iterator of text chunks answering the question from the gathered results."""
+
+
+# ---------- Mock ----------
+def parse_question(question: str) -> dict:
+    """Keyword plan used by the mock provider (and as a fallback when an LLM reply is not JSON)."""
+    q = question.lower()
+    plan = {"variable": "temperature", "aggregate": "mean", "region": None, "month": None, "year": None, "models": []}
+    for word, var in VARIABLES.items():
+        if re.search(rf"\b{word}\b", q):
+            plan["variable"] = var
+            break
+    for agg in ("min", "max", "count"):
+        if re.search(rf"\b{agg}(imum)?\b", q) or (agg == "count" and "how many" in q):
+            plan["aggregate"] = agg
+    for name, box in REGIONS.items():
+        if name in q:
+            plan["region"] = list(box)
+            break
+    for i, month in enumerate(MONTHS, start=1):
+        if month in q:
+            plan["month"] = i
+            break
+    year = re.search(r"\b(19|20)\d{2}\b", q)
+    if year:
+        plan["year"] = int(year.group())
+    plan["models"] = [m for m, keys in MODEL_KEYWORDS.items() if any(k in q for k in keys)]
+    return plan
+
+
+class MockLLMProvider(LLMProvider):
+    """Local stand-in: keyword planning and a templated answer, with optional artificial latency."""
+
+    def __init__(self, plan_delay: float = 0.0, answer_delay: float = 0.0):
+        self.plan_delay = plan_delay
+        self.answer_delay = answer_delay
+
+    async def plan(self, question: str) -> dict:
+        await asyncio.sleep(self.plan_delay)
+        return parse_question(question)
+
+    async def answer(self, question: str, results: dict):
+        data = results.get("data") or {}
+        parts = [f"{data.get('aggregate', 'value')} {data.get('variable', '')}: {data.get('value')}"
+                 f" over {data.get('n_profiles', 0)} profiles."]
+        for name, result in (results.get("models") or {}).items():
+            value = result.get("value") if isinstance(result, dict) else result
+            parts.append(f" Model {name}: {value}.")
+        for chunk in parts:
+            await asyncio.sleep(self.answer_delay)
+            yield chunk
+
+
+# ---------- Groq ----------
+class GroqLLMProvider(LLMProvider):
+    """Groq chat completions (AsyncGroq); reads GROQ_API_KEY like frontend/app/api/ocean-chat."""
+
+    def __init__(self, model: str = "llama-3.1-8b-instant", api_key: str = None):
+        from groq import AsyncGroq
+
+        api_key = api_key or os.environ.get("GROQ_API_KEY")
+        if not api_key:
+            raise ValueError("GROQ_API_KEY is not set. Cannot initialize Groq client.")
+        self.client = AsyncGroq(api_key=api_key)
+        self.model = model
+
+    async def plan(self, question: str) -> dict:
+        reply = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "system", "content": PLAN_PROMPT}, {"role": "user", "content": question}],
+            response_format={"type": "json_object"},
+            temperature=0,
+        )
+        try:
+            plan = parse_question(question)
+            plan.update(json.loads(reply.choices[0].message.content))
+            return plan
+        except (ValueError, TypeError):
+            return parse_question(question)
+
+    async def answer(self, question: str, results: dict):
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": "Answer the ocean-data question using only these results:\n"
+                                              + json.dumps(results, default=str)},
+                {"role": "user", "content": question},
+            ],
+            stream=True,
+        )
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
@@ -0,0 +1,171 @@
+"""
+Async query orchestrator (API Gateway → MCP in OceanFrontSysArchText.md)
+- LLM plan first, then the data query and every requested model prediction run concurrently
+- Partial results are streamed as events as soon as each stage finishes
+- Per-stage timeouts: a slow stage reports "timeout" and the answer uses what did arrive
+- Identical concurrent questions are coalesced onto one execution and share its event stream
+- Latency ≈ plan + max(data, models) + answer instead of the sum of every stage
+"""
+
+import asyncio
+import inspect
+import time
+
+DEFAULT_TIMEOUTS = {"plan": 10.0, "data": 15.0, "models": 10.0, "answer": 30.0}
+
+
+async def _call(fn, *args):
+    """Await coroutine functions; run blocking callables (pandas, XGBoost, TF) in a worker thread."""
+    if inspect.iscoroutinefunction(fn):
+        return await fn(*args)
+    return await asyncio.to_thread(fn, *args)
+
+
+class _Broadcast:
+    """Event log shared by every subscriber of one in-flight question."""
+
+    def __init__(self):
+        self.events = []
+        self.done = False
+        self._changed = asyncio.Condition()
+
+    async def publish(self, event: dict, final: bool = False):
+        async with self._changed:
+            self.events.append(event)
+            self.done = self.done or final
+            self._changed.notify_all()
+
+    async def subscribe(self):
+        seen = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self.events) > seen or self.done)
+                pending, finished = self.events[seen:], self.done
+            for event in pending:
+                yield event
+            seen += len(pending)
+            if finished and seen == len(self.events):
+                return
+
+
+class QueryOrchestrator:
+    """
+    llm:            an LLMProvider (see gateway.llm; MockLLMProvider for local testing)
+    data_executor:  callable(plan) → dict; sync callables run in a thread
+    models:         {name: callable(plan) → result}; run when the plan lists the name
+    timeouts:       per-stage seconds, keys plan / data / models / answer
+    """
+
+    def __init__(self, llm, data_executor, models: dict = None, timeouts: dict = None):
+        self.llm = llm
+        self.data_executor = data_executor
+        self.models = dict(models or {})
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self._inflight = {}
+
+    @staticmethod
+    def _key(question: str) -> str:
+        return " ".join(question.lower().split())
+
+    # ---------- Public API ----------
+    async def stream(self, question: str):
+        """
+        Async iterator of events:
+        {"stage": "plan" | "data" | "model" | "answer" | "done", "status": "ok" | "timeout" | "error", ...}
+        """
+        key = self._key(question)
+        broadcast = self._inflight.get(key)
+        if broadcast is None:
+            broadcast = _Broadcast()
+            self._inflight[key] = broadcast
+            task = asyncio.create_task(self._execute(question, broadcast))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        async for event in broadcast.subscribe():
+            yield event
+
+    async def run(self, question: str) -> dict:
+        """Collect the stream into one response: plan, data, models, answer text, timings."""
+        out = {"models": {}, "answer": ""}
+        async for event in self.stream(question):
+            stage = event["stage"]
+            if stage == "answer" and "delta" in event:
+                out["answer"] += event["delta"]
+            elif stage == "model":
+                out["models"][event["name"]] = event.get("result")
+            elif stage in ("plan", "data"):
+                out[stage] = event.get("result")
+            elif stage == "done":
+                out["elapsed"] = event["elapsed"]
+                out["timings"] = event["timings"]
+        return out
+
+    # ---------- Execution ----------
+    async def _stage(self, coro, timeout: float):
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(coro, timeout)
+            status = "ok"
+        except asyncio.TimeoutError:
+            result, status = None, "timeout"
+        except Exception as e:
+            result, status = str(e), "error"
+        return result, status, time.perf_counter() - start
+
+    async def _execute(self, question: str, broadcast: _Broadcast):
+        start = time.perf_counter()
+        timings = {}
+        try:
+            plan, status, timings["plan"] = await self._stage(self.llm.plan(question), self.timeouts["plan"])
+            await broadcast.publish({"stage": "plan", "status": status, "result": plan})
+            if status != "ok":
+                return
+
+            # Data query and model predictions are independent of each other → run concurrently
+            tasks = {
+                asyncio.create_task(self._stage(_call(self.data_executor, plan), self.timeouts["data"])):
+                    ("data", None),
+            }
+            for name in plan.get("models") or []:
+                if name in self.models:
+                    coro = self._stage(_call(self.models[name], plan), self.timeouts["models"])
+                    tasks[asyncio.create_task(coro)] = ("model", name)
+
+            results = {"plan": plan, "data": None, "models": {}}
+            pending = set(tasks)
+            while pending:
+                finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    kind, name = tasks[task]
+                    result, status, elapsed = task.result()
+                    timings[name or kind] = elapsed
+                    event = {"stage": kind, "status": status, "result": result}
+                    if kind == "model":
+                        event["name"] = name
+                        if status == "ok":
+                            results["models"][name] = result
+                    elif status == "ok":
+                        results["data"] = result
+                    await broadcast.publish(event)
+
+            # Stream the answer; the whole stage shares one timeout budget
+            answer_start = time.perf_counter()
+            deadline = answer_start + self.timeouts["answer"]
+            chunks = self.llm.answer(question, results).__aiter__()
+            while True:
+                remaining = deadline - time.perf_counter()
+                try:
+                    delta = await asyncio.wait_for(chunks.__anext__(), max(remaining, 0))
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    await broadcast.publish({"stage": "answer", "status": "timeout"})
+                    break
+                await broadcast.publish({"stage": "answer", "status": "ok", "delta": delta})
+            timings["answer"] = time.perf_counter() - answer_start
+        except Exception as e:
+            await broadcast.publish({"stage": "error", "status": "error", "result": str(e)})
+        finally:
+            await broadcast.publish(
+                {"stage": "done", "status": "ok", "elapsed": time.perf_counter() - start, "timings": timings},
+                final=True,
+            )
@@ -0,0 +1,112 @@
+"""
+Minimal streaming HTTP endpoint for the query orchestrator (stdlib asyncio, no web framework)
+- POST /query with {"question": "..."} or the frontend's {"messages": [...]} body
+- Streams orchestrator events back as NDJSON (one JSON object per line, chunked encoding)
+- The trained models under backend/models (tz, mld, max_depth) answer the plan's model requests
+
+Run from backend/:
+    python -m gateway.server                 # MockLLMProvider unless GROQ_API_KEY is set
+"""
+
+import asyncio
+import glob
+import json
+import os
+
+from .data import ProfileQueryExecutor, model_executors
+from .llm import GroqLLMProvider, MockLLMProvider
+from .orchestrator import QueryOrchestrator
+
+# --------- PATHS: adjust for your machine ---------
+PARQUET_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "oceanFrontData", "Parquet")
+MODELS_DIR = os.path.join(os.path.dirname(__file__), "..", "models")
+HOST, PORT = "127.0.0.1", 8765
+# --------------------------------------------------
+
+
+def _question_from_body(body: dict) -> str:
+    if body.get("question"):
+        return str(body["question"])
+    for message in reversed(body.get("messages") or []):
+        if message.get("role") == "user":
+            content = message.get("content")
+            if isinstance(content, list):
+                content = " ".join(p.get("text", "") for p in content if isinstance(p, dict))
+            return str(content)
+    raise ValueError("Body must contain 'question' or a user message in 'messages'")
+
+
+async def _write_chunk(writer, text: str):
+    data = text.encode("utf-8")
+    writer.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+    await writer.drain()
+
+
+async def handle(reader, writer, orchestrator: QueryOrchestrator):
+    try:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+        if len(request_line) < 2 or request_line[0] != "POST" or request_line[1] != "/query":
+            writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            return
+        try:
+            question = _question_from_body(json.loads(body or b"{}"))
+        except ValueError as e:
+            msg = json.dumps({"error": str(e)}).encode()
+            writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Type: application/json\r\n"
+                         + f"Content-Length: {len(msg)}\r\nConnection: close\r\n\r\n".encode() + msg)
+            return
+
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\nCache-Control: no-cache\r\nConnection: close\r\n\r\n")
+        async for event in orchestrator.stream(question):
+            await _write_chunk(writer, json.dumps(event, default=str) + "\n")
+        writer.write(b"0\r\n\r\n")
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        # the early 404 / 400 returns still need their response flushed; a dropped client raises here too
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+
+async def serve(orchestrator: QueryOrchestrator, host: str = HOST, port: int = PORT):
+    server = await asyncio.start_server(lambda r, w: handle(r, w, orchestrator), host, port)
+    print(f"[INFO] Query gateway listening on http://{host}:{port}/query")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    from pipeline import ProfileStore
+    from pipeline.ensemble import EnsembleEngine, default_models
+    from pipeline.parallel import read_argo_parquet
+
+    files = sorted(glob.glob(os.path.join(PARQUET_DIR, "*.parquet")))
+    if not files:
+        raise ValueError(f"No Parquet files found in {PARQUET_DIR}")
+    store = ProfileStore.concat(read_argo_parquet(f).filter_qc()[0] for f in files)
+    print(f"[INFO] Loaded {store}")
+
+    data = ProfileQueryExecutor(store)
+    models = model_executors(data, EnsembleEngine(default_models(MODELS_DIR)))
+    print(f"[INFO] Model predictions available: {sorted(models) or 'none'}")
+
+    llm = GroqLLMProvider() if os.environ.get("GROQ_API_KEY") else MockLLMProvider()
+    orchestrator = QueryOrchestrator(llm, data, models)
+    asyncio.run(serve(orchestrator))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,9 @@ LSTM Model Training for Mixed Layer Depth Prediction
 - Loads multiple Parquet files
 - Normalizes Argo schema (pres/temp/psal → depth/temperature/salinity)
 - Computes Mixed Layer Depth (temperature-threshold method)
-- Trains an LSTM
+- Trains an LSTM (optional CPU performance mode: float32 inputs, tuned threading,
+  larger batches with learning-rate scaling; XLA is opt-in)
+- Windows are strided views over the scaled feature matrix; only the current batch is copied
 - Exports model (.keras) and scalers
 - Optionally reloads the model to verify
 """
@@ -37,17 +39,53 @@ from tensorflow import keras
 from keras.models import Sequential
 from keras.layers import LSTM, Dense, Dropout
 from keras.callbacks import EarlyStopping, ModelCheckpoint, ReduceLROnPlateau
+import sys
+
+# backend/ on the path so the shared pipeline package is importable when run as a script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from pipeline.features import sliding_windows
+from pipeline.incremental import finetune_lstm, save_baseline_metrics
+from pipeline.parallel import ParallelFeatureExecutor, minmax_inplace
+from pipeline.qc import QCPolicy, apply_qc
 
 # Reproducibility
 np.random.seed(42)
 tf.random.set_seed(42)
 
+class WindowBatches(keras.utils.Sequence):
+    """Batches gathered by index from a strided window view; only the current batch is materialized."""
+
+    def __init__(self, windows, targets, indices, batch_size=32, shuffle=False, seed=42):
+        super().__init__()
+        self.windows = windows
+        self.targets = targets
+        self.indices = np.asarray(indices)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self._rng = np.random.default_rng(seed)
+        if shuffle:
+            self._rng.shuffle(self.indices)
+
+    def __len__(self):
+        return int(np.ceil(len(self.indices) / self.batch_size))
+
+    def __getitem__(self, i):
+        # Sorted within the batch for memory locality; the order inside a batch does not affect the step
+        idx = np.sort(self.indices[i * self.batch_size:(i + 1) * self.batch_size])
+        return self.windows[idx], self.targets[idx]
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            self._rng.shuffle(self.indices)
+
 
 class MLDPredictor:
-    def __init__(self, parquet_dir: str, model_save_dir: str):
+    def __init__(self, parquet_dir: str, model_save_dir: str, qc_policy: QCPolicy = None):
         self.parquet_dir = parquet_dir
         self.model_save_dir = model_save_dir
+        self.qc_policy = qc_policy or QCPolicy()
         self.model = None
+        self.test_metrics = None
         self.scaler_X = MinMaxScaler()
         self.scaler_y = MinMaxScaler()
         os.makedirs(self.model_save_dir, exist_ok=True)
@@ -123,9 +161,23 @@ class MLDPredictor:
     def normalize_argo_columns(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Map Argo vars to generic names and build date_time/profile_id.
-        Uses *_adjusted columns if available; applies QC if present.
+        Uses *_adjusted columns if available; applies self.qc_policy if QC flags are present.
         Robust JULD handling: supports numeric days-since-1950, strings, or datetime-like.
+        NODC files repeat every level across n_param × n_calib × n_history; like ProfileStore,
+        only the first row per (profile, n_prof, n_levels) is kept.
         """
+        if "n_levels" in df.columns:
+            if "profile_id" in df.columns:
+                key = ["profile_id"]
+            elif "platform_number" in df.columns and "cycle_number" in df.columns:
+                key = ["platform_number", "cycle_number"]
+            else:
+                key = [c for c in ("latitude", "longitude", "juld", "date_time") if c in df.columns]
+            subset = key + [c for c in ("n_prof", "n_levels") if c in df.columns]
+            n_before = len(df)
+            df = df.drop_duplicates(subset=subset, keep="first")
+            print(f"[INFO] Collapsed repeated NODC levels: {n_before} → {len(df)} rows")
+
         pres_col = "pres_adjusted" if "pres_adjusted" in df.columns else ("pres" if "pres" in df.columns else None)
         temp_col = "temp_adjusted" if "temp_adjusted" in df.columns else ("temp" if "temp" in df.columns else None)
         psal_col = "psal_adjusted" if "psal_adjusted" in df.columns else ("psal" if "psal" in df.columns else None)
@@ -137,16 +189,10 @@ class MLDPredictor:
             if psal_col is None: missing.append("psal/psal_adjusted")
             raise ValueError(f"Argo variables missing: {missing}")
 
-        out = df.copy()
-
-        # QC filter (keep flags '1' or '2' when present)
-        def qc_mask(col):
-            if col in out.columns:
-                return out[col].astype(str).isin(["1", "2"])
-            return pd.Series(True, index=out.index)
-
-        mask = qc_mask(pres_col + "_qc") & qc_mask(temp_col + "_qc") & qc_mask(psal_col + "_qc")
-        out = out.loc[mask].copy()
+        # QC filter (default: keep flags '1' or '2' when present), decoded once to uint8
+        qc = apply_qc(df, self.qc_policy, columns={"depth": pres_col, "temperature": temp_col, "salinity": psal_col})
+        print(qc.summary())
+        out = df.loc[qc.mask].copy()
 
         # Map to expected names
         out["depth"] = pd.to_numeric(out[pres_col], errors="coerce").astype(float)      # dbar ~ m
@@ -243,75 +289,159 @@ class MLDPredictor:
         if not used:
             raise ValueError("No valid feature columns found after normalization")
 
-        X = df[used].to_numpy()
-        y = df["mixed_layer_depth"].to_numpy().reshape(-1, 1)
+        X = df[used].to_numpy(dtype=np.float32)
+        y = df["mixed_layer_depth"].to_numpy(dtype=np.float32).reshape(-1, 1)
 
         mask = ~(np.isnan(X).any(axis=1) | np.isnan(y).any(axis=1))
         X, y = X[mask], y[mask]
         print(f"[INFO] Final dataset: X={X.shape}, y={y.shape}")
         return X, y
 
+    def prepare_features_parallel(self, n_workers: int = None):
+        """
+        Parquet-native counterpart of prepare_features (same QC, NODC collapse, MLD rule and
+        feature columns), built per file from Arrow buffers; rows are ordered by time, then profile
+        and depth. n_workers=1 runs in-process without a pool or IPC.
+        The scalers are fitted during the global reduce, so train with fit_scalers=False.
+        """
+        parquet_files = sorted(glob.glob(os.path.join(self.parquet_dir, "*.parquet")))
+        if not parquet_files:
+            raise ValueError(f"No Parquet files found in {self.parquet_dir}")
+        executor = ParallelFeatureExecutor(n_workers=n_workers, qc_policy=self.qc_policy)
+        features = executor.run(parquet_files)
+        self.scaler_X, self.scaler_y = features.scaler_X, features.scaler_y
+        return features.X, features.y
+
+    def prepare_features_from_netcdf(self, source, profiles_per_batch: int = 1024):
+        """
+        Same features, streamed lazily from NetCDF/Zarr (a directory, glob or list of paths)
+        without converting to Parquet first. Scalers are fitted here; train with fit_scalers=False.
+        """
+        # xarray / dask are only needed for this path, so Parquet-only setups don't require them
+        from pipeline.netcdf_reader import ArgoArchiveReader
+
+        reader = ArgoArchiveReader(source, profiles_per_batch=profiles_per_batch)
+        features = reader.features(qc_policy=self.qc_policy)
+        self.scaler_X, self.scaler_y = features.scaler_X, features.scaler_y
+        return features.X, features.y
+
+    # ---------- Performance ----------
+    @staticmethod
+    def configure_cpu(intra_op_threads: int = None, inter_op_threads: int = None, mixed_precision: bool = False):
+        """
+        CPU threading / precision for training. Must run before TensorFlow executes its first op.
+        intra_op_threads: threads inside one op (matmuls of the LSTM gates); None → TF default
+        inter_op_threads: independent ops run concurrently; an LSTM stack is mostly sequential, so 1-2
+        mixed_precision:  bfloat16 compute with float32 weights (pays off on CPUs with AVX512-BF16 / AMX)
+        """
+        try:
+            if intra_op_threads:
+                tf.config.threading.set_intra_op_parallelism_threads(int(intra_op_threads))
+            if inter_op_threads:
+                tf.config.threading.set_inter_op_parallelism_threads(int(inter_op_threads))
+        except RuntimeError as e:
+            print(f"[WARNING] Threading not changed (TensorFlow already initialized): {e}")
+        keras.mixed_precision.set_global_policy("mixed_bfloat16" if mixed_precision else "float32")
+        print(f"[INFO] CPU config: intra_op={tf.config.threading.get_intra_op_parallelism_threads() or 'default'}, "
+              f"inter_op={tf.config.threading.get_inter_op_parallelism_threads() or 'default'}, "
+              f"policy={keras.mixed_precision.global_policy().name}")
+
+    @staticmethod
+    def scaled_learning_rate(batch_size: int, base_lr: float = 1e-3, base_batch_size: int = 32) -> float:
+        """Square-root LR scaling for Adam: batch 32 → 1e-3, batch 512 → 4e-3."""
+        return base_lr * float(np.sqrt(batch_size / base_batch_size))
+
     # ---------- Model ----------
-    def build_lstm_model(self, input_shape):
+    def build_lstm_model(self, input_shape, learning_rate: float = 1e-3, jit_compile: bool = False,
+                         use_cudnn="auto"):
+        """use_cudnn: "auto" → fused cuDNN kernel when a GPU is present, False → generic kernel (no effect on CPU)"""
         print("[INFO] Building LSTM model...")
         model = Sequential([
-            LSTM(128, return_sequences=True, input_shape=input_shape),
+            LSTM(128, return_sequences=True, input_shape=input_shape, use_cudnn=use_cudnn),
             Dropout(0.2),
-            LSTM(64, return_sequences=True),
+            LSTM(64, return_sequences=True, use_cudnn=use_cudnn),
             Dropout(0.2),
-            LSTM(32),
+            LSTM(32, use_cudnn=use_cudnn),
             Dropout(0.2),
             Dense(16, activation="relu"),
             Dropout(0.1),
-            Dense(1)
+            Dense(1, dtype="float32")   # keep the regression output float32 under mixed precision
         ])
-        model.compile(optimizer=keras.optimizers.Adam(1e-3), loss="mse", metrics=["mae", "mse"])
+        model.compile(optimizer=keras.optimizers.Adam(learning_rate), loss="mse", metrics=["mae", "mse"],
+                      jit_compile=jit_compile)
         model.summary()
         return model
 
     def create_sequences(self, X, y, time_steps=30):
-        Xs, ys = [], []
-        for i in range(len(X) - time_steps):
-            Xs.append(X[i:i+time_steps])
-            ys.append(y[i+time_steps])
-        Xs = np.asarray(Xs)
-        ys = np.asarray(ys)
+        """
+        Windows X[i:i+time_steps] → y[i+time_steps], as a strided view over X (no per-window copies).
+        Keeps the input dtype, so float32 features stay float32 all the way into the model.
+        """
+        Xs, ys = sliding_windows(np.asarray(X), np.asarray(y), time_steps)
         print(f"[INFO] Sequence shapes: X={Xs.shape}, y={ys.shape}")
         return Xs, ys
 
-    def train(self, X, y, time_steps=30, epochs=50, batch_size=32, validation_split=0.2):
+    def train(self, X, y, time_steps=30, epochs=50, batch_size=32, validation_split=0.2, fit_scalers=True,
+              learning_rate: float = None, jit_compile: bool = False, inplace: bool = False, callbacks=None,
+              use_cudnn="auto"):
+        """
+        learning_rate: None → scaled_learning_rate(batch_size), i.e. 1e-3 at the default batch of 32
+        jit_compile:   XLA-compile the train step; measured ~5x slower per epoch than the default
+                       kernel on TF 2.21 CPU (benchmark_training.py), so off unless re-benchmarked
+        inplace:       scale X / y in place instead of allocating scaled copies (X / y are overwritten)
+        callbacks:     extra Keras callbacks (e.g. timers) run alongside the built-in ones
+        use_cudnn:     passed to the LSTM layers; False forces the generic kernel on GPU
+        """
         print("[INFO] Starting training...")
-        Xs = self.scaler_X.fit_transform(X)
-        ys = self.scaler_y.fit_transform(y)
+        if learning_rate is None:
+            learning_rate = self.scaled_learning_rate(batch_size)
+        if fit_scalers:
+            self.scaler_X.fit(X)
+            self.scaler_y.fit(y)
+        if inplace:
+            Xs, ys = minmax_inplace(self.scaler_X, X), minmax_inplace(self.scaler_y, y)
+        else:
+            Xs, ys = self.scaler_X.transform(X), self.scaler_y.transform(y)
         X_seq, y_seq = self.create_sequences(Xs, ys, time_steps)
-        X_tr, X_te, y_tr, y_te = train_test_split(X_seq, y_seq, test_size=0.2, random_state=42)
 
-        self.model = self.build_lstm_model((time_steps, X.shape[1]))
+        # Split window indices rather than windows (same split as before); batches are gathered on demand
+        tr_idx, te_idx = train_test_split(np.arange(len(X_seq)), test_size=0.2, random_state=42)
+        te_idx = np.sort(te_idx)   # batches are gathered in sorted order, keep y_true aligned
+        split = int(len(tr_idx) * (1 - validation_split))
+        train_batches = WindowBatches(X_seq, y_seq, tr_idx[:split], batch_size, shuffle=True)
+        val_batches = WindowBatches(X_seq, y_seq, tr_idx[split:], batch_size) if split < len(tr_idx) else None
+        test_batches = WindowBatches(X_seq, y_seq, te_idx, batch_size)
+
+        self.model = self.build_lstm_model((time_steps, X.shape[1]), learning_rate=learning_rate,
+                                           jit_compile=jit_compile, use_cudnn=use_cudnn)
+        print(f"[INFO] batch_size={batch_size}, learning_rate={learning_rate:.2e}, XLA={jit_compile}")
 
         ckpt_path = os.path.join(self.model_save_dir, "lstm_mld_best.keras")
         callbacks = [
             EarlyStopping(monitor="val_loss", patience=12, restore_best_weights=True, verbose=1),
             ModelCheckpoint(ckpt_path, monitor="val_loss", save_best_only=True, verbose=1),
             ReduceLROnPlateau(monitor="val_loss", factor=0.5, patience=5, min_lr=1e-5, verbose=1)
-        ]
+        ] + list(callbacks or [])
 
         history = self.model.fit(
-            X_tr, y_tr,
-            validation_split=validation_split,
+            train_batches,
+            validation_data=val_batches,
             epochs=epochs,
-            batch_size=batch_size,
             callbacks=callbacks,
             verbose=1
         )
 
         # Evaluate
-        loss, mae, mse = self.model.evaluate(X_te, y_te, verbose=0)
-        y_pred_scaled = self.model.predict(X_te, verbose=0)
+        loss, mae, mse = self.model.evaluate(test_batches, verbose=0)
+        y_pred_scaled = self.model.predict(test_batches, verbose=0)
         y_pred = self.scaler_y.inverse_transform(y_pred_scaled)
-        y_true = self.scaler_y.inverse_transform(y_te)
+        y_true = self.scaler_y.inverse_transform(y_seq[te_idx])
         rmse = float(np.sqrt(mean_squared_error(y_true, y_pred)))
         mae_ = float(mean_absolute_error(y_true, y_pred))
         print(f"[RESULTS] Test MAE: {mae_:.3f} m  |  RMSE: {rmse:.3f} m")
+        # Baseline for later fine-tunes; EarlyStopping restored the weights the checkpoint holds
+        self.test_metrics = {"rmse": rmse, "mae": mae_}
+        save_baseline_metrics(ckpt_path, self.test_metrics, n_test=len(te_idx))
 
         self._plot_history(history)
         return history, (rmse, mae_)
@@ -336,9 +466,42 @@ class MLDPredictor:
         self.model.save(path)  # Keras v3 format
         joblib.dump(self.scaler_X, os.path.join(self.model_save_dir, f"{model_name}_scaler_X.pkl"))
         joblib.dump(self.scaler_y, os.path.join(self.model_save_dir, f"{model_name}_scaler_Y.pkl"))
+        if self.test_metrics is not None:
+            save_baseline_metrics(path, self.test_metrics)
         print(f"[INFO] Saved model to {path}")
         return path
 
+    def finetune(self, X_new, y_new, model_name="lstm_mld_model", scaler_name="lstm_mld_model",
+                 time_steps=30, epochs=3, batch_size=32, X_reference=None, X_holdout=None, y_holdout=None):
+        """
+        Incremental update: fine-tune the saved model on newly arrived rows with the saved scalers.
+        model_name defaults to the exported model that pipeline.ensemble.default_models scores, so an
+        accepted update is what the gateway serves next; lstm_mld_best is only the training checkpoint.
+        X_holdout / y_holdout: fixed held-out rows (windowed separately) to decide whether the update is kept.
+        Without them the last 20% of the new sequences is held out, and the time_steps windows before
+        it are dropped so no fine-tune window shares a row with a held-out window.
+        """
+        self.scaler_X = joblib.load(os.path.join(self.model_save_dir, f"{scaler_name}_scaler_X.pkl"))
+        self.scaler_y = joblib.load(os.path.join(self.model_save_dir, f"{scaler_name}_scaler_Y.pkl"))
+        X_seq, y_seq = self.create_sequences(self.scaler_X.transform(X_new), self.scaler_y.transform(y_new), time_steps)
+        if X_holdout is not None:
+            X_seq_ho, y_seq_ho = self.create_sequences(self.scaler_X.transform(X_holdout),
+                                                       self.scaler_y.transform(y_holdout), time_steps)
+        else:
+            split = int(len(X_seq) * 0.8)
+            if split - time_steps <= 0:
+                raise ValueError(f"Too few new rows to hold out windows with a {time_steps}-step gap; "
+                                 f"pass X_holdout / y_holdout")
+            X_seq_ho, y_seq_ho = X_seq[split:], y_seq[split:]
+            X_seq, y_seq = X_seq[:split - time_steps], y_seq[:split - time_steps]
+        self.model, report = finetune_lstm(
+            os.path.join(self.model_save_dir, f"{model_name}.keras"),
+            X_seq, y_seq, X_seq_ho, y_seq_ho,
+            epochs=epochs, batch_size=batch_size, scaler_y=self.scaler_y,
+            X_reference=X_reference, X_current=X_new,
+        )
+        return report
+
     @staticmethod
     def load_model(model_path: str):
         if not os.path.isfile(model_path):
@@ -356,6 +519,9 @@ def main():
     TIME_STEPS = 30
     EPOCHS = 60
     BATCH_SIZE = 32
+    PERF_MODE = False            # True → tuned CPU threading, batch 256 (LR scaled); see benchmark_training.py
+    N_WORKERS = os.cpu_count()   # 1 → same Arrow path in-process (no pool / IPC)
+    NETCDF_SOURCE = None         # e.g. the oceanFrontData/NetCDF folder → train straight from .nc files
 
     print("=" * 72)
     print("LSTM Mixed Layer Depth Prediction - Training Pipeline")
@@ -364,12 +530,23 @@ def main():
     print("PARQUET_DIR:", PARQUET_DIR)
     print("MODEL_SAVE_DIR:", MODEL_SAVE_DIR)
 
+    train_kwargs = {"inplace": True}   # X / Y are not reused after training
+    if PERF_MODE:
+        MLDPredictor.configure_cpu(intra_op_threads=os.cpu_count(), inter_op_threads=2)
+        BATCH_SIZE = 256
+
     predictor = MLDPredictor(PARQUET_DIR, MODEL_SAVE_DIR)
 
     # Train
-    df = predictor.load_multiple_parquet_files()
-    X, Y = predictor.prepare_features(df)
-    _, metrics = predictor.train(X, Y, time_steps=TIME_STEPS, epochs=EPOCHS, batch_size=BATCH_SIZE)
+    if NETCDF_SOURCE:
+        X, Y = predictor.prepare_features_from_netcdf(NETCDF_SOURCE)
+        _, metrics = predictor.train(X, Y, time_steps=TIME_STEPS, epochs=EPOCHS, batch_size=BATCH_SIZE,
+                                     fit_scalers=False, **train_kwargs)
+    else:
+        # One path regardless of core count, so the training set and split do not depend on the machine
+        X, Y = predictor.prepare_features_parallel(n_workers=N_WORKERS)
+        _, metrics = predictor.train(X, Y, time_steps=TIME_STEPS, epochs=EPOCHS, batch_size=BATCH_SIZE,
+                                     fit_scalers=False, **train_kwargs)
 
     # Save
     saved_path = predictor.save_model("lstm_mld_model")
@@ -0,0 +1,159 @@
+"""
+Epoch-time benchmark for MLDPredictor training modes
+- Builds features from the bundled Parquet files, then scales them up synthetically
+  (tiled rows with small Gaussian jitter) so an epoch is long enough to time
+- Runs each configuration in its own process (TF threading can only be set before init)
+- Every configuration trains through MLDPredictor.train(): strided windows, index split and
+  WindowBatches gathering one batch at a time, so epoch times include that gather
+- baseline: float64 inputs scaled into copies, batch 32, default threading, no XLA (the original training path)
+- tuned:    float32 inputs scaled in place, batch 256 with scaled LR, intra/inter-op threads set
+- tuned_xla:  tuned + XLA-compiled train step (slower than tuned on TF 2.21 CPU builds; kept to re-check)
+- tuned_bf16: tuned + mixed bfloat16 (only faster on CPUs with native bf16 support)
+- tuned_no_cudnn: tuned with use_cudnn=False (generic LSTM kernel; only differs from tuned on GPU)
+
+Run from backend/models/LSTM:
+    python benchmark_training.py --rows 200000 --epochs 3
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# --------- PATHS: adjust for your machine ---------
+PARQUET_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "oceanFrontData", "Parquet")
+LSTM_SCRIPT = os.path.join(os.path.dirname(__file__), "LSTM-2.py")
+# --------------------------------------------------
+
+CONFIGS = {
+    "baseline": {"dtype": "float64", "batch_size": 32, "intra": None, "inter": None, "xla": False, "bf16": False,
+                 "inplace": False, "cudnn": "auto"},
+    "tuned": {"dtype": "float32", "batch_size": 256, "intra": os.cpu_count(), "inter": 2, "xla": False, "bf16": False,
+              "inplace": True, "cudnn": "auto"},
+    "tuned_xla": {"dtype": "float32", "batch_size": 256, "intra": os.cpu_count(), "inter": 2, "xla": True, "bf16": False,
+                  "inplace": True, "cudnn": "auto"},
+    "tuned_no_cudnn": {"dtype": "float32", "batch_size": 256, "intra": os.cpu_count(), "inter": 2, "xla": False,
+                       "bf16": False, "inplace": True, "cudnn": False},
+    "tuned_bf16": {"dtype": "float32", "batch_size": 256, "intra": os.cpu_count(), "inter": 2, "xla": False, "bf16": True,
+                   "inplace": True, "cudnn": "auto"},
+}
+
+
+def _load_lstm_module():
+    # LSTM-2.py is not an importable module name
+    spec = importlib.util.spec_from_file_location("lstm_mld", LSTM_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# ---------- Data ----------
+def synthetic_features(n_rows: int, seed: int = 42):
+    """Bundled-data features tiled to n_rows, jittered by 1% of each column's spread."""
+    lstm = _load_lstm_module()
+    with tempfile.TemporaryDirectory() as tmp:
+        X, y = lstm.MLDPredictor(PARQUET_DIR, tmp).prepare_features_parallel(n_workers=1)
+    if not len(X):
+        raise ValueError(f"No rows survived QC in {PARQUET_DIR}")
+    rng = np.random.default_rng(seed)
+    reps = -(-n_rows // len(X))
+    X = np.tile(X, (reps, 1))[:n_rows]
+    y = np.tile(y, (reps, 1))[:n_rows]
+    spread = np.maximum(X.max(axis=0) - X.min(axis=0), 1e-3)
+    X = X + rng.normal(0.0, 0.01, X.shape).astype(np.float32) * spread
+    y = y + rng.normal(0.0, 0.01 * max(float(np.ptp(y)), 1.0), y.shape).astype(np.float32)
+    print(f"[INFO] Synthetic dataset: X={X.shape}, y={y.shape} ({X.nbytes / 1e6:.1f} MB float32)")
+    return X.astype(np.float32), y.astype(np.float32)
+
+
+# ---------- One configuration (child process) ----------
+def run_config(name: str, data_path: str, epochs: int, time_steps: int) -> dict:
+    cfg = CONFIGS[name]
+    lstm = _load_lstm_module()
+    if cfg["intra"] or cfg["inter"] or cfg["bf16"]:
+        lstm.MLDPredictor.configure_cpu(cfg["intra"], cfg["inter"], mixed_precision=cfg["bf16"])
+
+    data = np.load(data_path)
+    X, y = data["X"].astype(cfg["dtype"]), data["y"].astype(cfg["dtype"])
+
+    epoch_times = []
+
+    class EpochTimer(lstm.keras.callbacks.Callback):
+        def on_epoch_begin(self, epoch, logs=None):
+            self._start = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            epoch_times.append(time.perf_counter() - self._start)
+
+    n_windows = len(X) - time_steps
+    with tempfile.TemporaryDirectory() as tmp:
+        predictor = lstm.MLDPredictor(PARQUET_DIR, tmp)
+        history, (rmse, _) = predictor.train(X, y, time_steps=time_steps, epochs=epochs, batch_size=cfg["batch_size"],
+                                             jit_compile=cfg["xla"], inplace=cfg["inplace"], callbacks=[EpochTimer()],
+                                             use_cudnn=cfg["cudnn"])
+
+    # The first epoch includes graph tracing / XLA compilation; report steady state separately
+    steady = epoch_times[1:] or epoch_times
+    return {
+        "config": name,
+        "first_epoch_s": epoch_times[0],
+        "epoch_s": float(np.median(steady)),
+        "final_loss": float(history.history["loss"][-1]),
+        "test_rmse": rmse,
+        "samples": n_windows,
+    }
+
+
+# ---------- Driver ----------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000, help="synthetic feature rows")
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--time-steps", type=int, default=30)
+    parser.add_argument("--configs", nargs="+", default=["baseline", "tuned"], choices=sorted(CONFIGS))
+    parser.add_argument("--run-config", help=argparse.SUPPRESS)
+    parser.add_argument("--data", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_config:
+        print("RESULT " + json.dumps(run_config(args.run_config, args.data, args.epochs, args.time_steps)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, "features.npz")
+        X, y = synthetic_features(args.rows)
+        np.savez(data_path, X=X, y=y)
+
+        results = []
+        for name in args.configs:
+            print(f"[INFO] Running {name}: {CONFIGS[name]}")
+            proc = subprocess.run(
+                [sys.executable, __file__, "--run-config", name, "--data", data_path,
+                 "--epochs", str(args.epochs), "--time-steps", str(args.time_steps)],
+                capture_output=True, text=True,
+            )
+            lines = [l for l in proc.stdout.splitlines() if l.startswith("RESULT ")]
+            if proc.returncode or not lines:
+                print(f"[WARNING] {name} failed:\n{proc.stderr[-2000:]}")
+                continue
+            results.append(json.loads(lines[-1][len("RESULT "):]))
+
+    if not results:
+        return
+    base = next((r for r in results if r["config"] == "baseline"), results[0])
+    print("=" * 76)
+    print(f"{'config':<16}{'epoch (s)':>12}{'1st epoch (s)':>16}{'speedup':>10}{'loss':>12}{'test RMSE (m)':>15}")
+    for r in results:
+        print(f"{r['config']:<16}{r['epoch_s']:>12.2f}{r['first_epoch_s']:>16.2f}"
+              f"{base['epoch_s'] / r['epoch_s']:>9.2f}x{r['final_loss']:>12.5f}{r['test_rmse']:>15.2f}")
+    print(f"[RESULTS] {len(results)} configs on {results[0]['samples']} windows, {args.epochs} epochs each")
+
+
+if __name__ == "__main__":
+    main()
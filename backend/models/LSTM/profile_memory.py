@@ -0,0 +1,209 @@
+"""
+Peak-memory check for the Parquet → features → LSTM training path
+- Writes synthetic NODC-style Argo Parquet files: binary QC flags / metadata, float32 levels, and
+  every level repeated `copies` times with n_prof / n_levels columns (the n_param × n_calib × n_history
+  cross product the store collapses)
+- Runs each path in a fresh process; TensorFlow is imported and warmed up with a tiny fit before the
+  baseline RSS is taken, so the runtime's fixed cost is not counted as data growth
+- arrow:  MLDPredictor.prepare_features_parallel(n_workers) (worker processes, Arrow IPC handback,
+          global reduce) → MLDPredictor.train(inplace=True) (strided windows, WindowBatches)
+- legacy: load_multiple_parquet_files → prepare_features (pandas) → scaled copies → materialized
+          windows → train_test_split → model.fit on arrays (the training path before WindowBatches)
+- Training stops after --steps batches; batches are gathered one at a time, so more steps do not
+  raise the peak, while the post-fit validation / test passes still run over every window
+- Reports the training process's peak RSS growth against the deduplicated float32 feature bytes
+  (IPC payloads are deserialized in that process, so their copies are included)
+- Limit: peak ≤ --fixed-mb + --max-multiple × feature bytes. Measured on the arrow path (4 files,
+  3 copies, 2 workers, 1 core): 16 / 32 / 64 MB of features peaked at +199 / +239 / +341 MB, i.e.
+  ~150 MB that does not scale (tracing the fresh model's train / eval / predict functions) plus
+  ~3x the feature bytes (IPC tables with profile id / time columns, their concatenation and the
+  time-order gather into X / y). The legacy path peaked at +3366 MB (105x) for 32 MB of features.
+
+Run from backend/models/LSTM:
+    python profile_memory.py --profiles 10000 --levels 100 --copies 3 --files 4 --workers 2
+"""
+
+import argparse
+import glob
+import importlib.util
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sklearn.model_selection import train_test_split
+
+LSTM_SCRIPT = os.path.join(os.path.dirname(__file__), "LSTM-2.py")
+TIME_STEPS = 30
+BATCH_SIZE = 256
+
+
+def _load_lstm_module():
+    # LSTM-2.py is not an importable module name
+    spec = importlib.util.spec_from_file_location("lstm_mld", LSTM_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# ---------- Synthetic data ----------
+def write_synthetic_argo(path: str, n_profiles: int, n_levels: int, copies: int, first_profile: int = 0,
+                         seed: int = 42):
+    """One NODC-style file: each (profile, level) row appears `copies` times, as in the bundled files."""
+    rng = np.random.default_rng(seed + first_profile)
+    n = n_profiles * n_levels
+    prof = np.repeat(np.arange(n_profiles), n_levels)
+    level = np.tile(np.arange(n_levels), n_profiles)
+    depth = np.tile(np.linspace(0, 2000, n_levels, dtype=np.float32), n_profiles)
+    sst = rng.uniform(0, 30, n_profiles).astype(np.float32)
+    temp = sst[prof] * np.exp(-depth / 500, dtype=np.float32) + rng.normal(0, 0.05, n).astype(np.float32)
+    psal = (34.5 + depth / 4000 + rng.normal(0, 0.01, n)).astype(np.float32)
+    gprof = first_profile + prof
+    platform = np.char.mod(b"%-8d", 1900000 + gprof // 50).astype("S8")
+    juld = np.datetime64("2020-01-01", "ns") + (gprof * 86_400e9 / 20).astype("timedelta64[ns]")
+
+    rep = np.tile(np.arange(n), copies)   # copy c of every level follows all of copy c-1
+    flag = pa.array(np.full(rep.size, b"1", dtype="S1"), pa.binary())
+    grade = pa.array(np.full(rep.size, b"A", dtype="S1"), pa.binary())
+    table = pa.table({
+        "n_prof": np.zeros(rep.size, dtype=np.int64),
+        "n_levels": level[rep].astype(np.int64),
+        "platform_number": pa.array(platform[rep], pa.binary()),
+        "cycle_number": (gprof[rep] % 50).astype(np.float64),
+        "juld": juld[rep],
+        "latitude": rng.uniform(-60, 30, n_profiles)[prof][rep],
+        "longitude": rng.uniform(20, 147, n_profiles)[prof][rep],
+        "profile_pres_qc": grade, "profile_temp_qc": grade, "profile_psal_qc": grade,
+        "pres": depth[rep], "pres_qc": flag, "pres_adjusted": depth[rep], "pres_adjusted_qc": flag,
+        "temp": temp[rep], "temp_qc": flag, "temp_adjusted": temp[rep], "temp_adjusted_qc": flag,
+        "psal": psal[rep], "psal_qc": flag, "psal_adjusted": psal[rep], "psal_adjusted_qc": flag,
+    })
+    pq.write_table(table, path)
+
+
+def write_synthetic_dir(data_dir: str, n_profiles: int, n_levels: int, copies: int, n_files: int):
+    per_file = -(-n_profiles // n_files)
+    for i in range(n_files):
+        count = min(per_file, n_profiles - i * per_file)
+        write_synthetic_argo(os.path.join(data_dir, f"synthetic_{i:03d}.parquet"), count, n_levels, copies,
+                             first_profile=i * per_file)
+    size = sum(os.path.getsize(p) for p in glob.glob(os.path.join(data_dir, "*.parquet")))
+    print(f"[INFO] Wrote {n_profiles} profiles × {n_levels} levels × {copies} copies in {n_files} files "
+          f"({size / 1e6:.1f} MB) to {data_dir}")
+
+
+# ---------- Data paths (child process) ----------
+def _stop_after(lstm, steps: int):
+    class StopAfter(lstm.keras.callbacks.Callback):
+        def on_train_batch_end(self, batch, logs=None):
+            if batch + 1 >= steps:
+                self.model.stop_training = True
+    return StopAfter()
+
+
+def _warm_up(lstm, tmp: str):
+    """Initialize the TF runtime (kernels, allocator, tracing) on a toy model before the baseline."""
+    predictor = lstm.MLDPredictor(tmp, tmp)
+    model = predictor.build_lstm_model((TIME_STEPS, 7))
+    x = np.zeros((BATCH_SIZE, TIME_STEPS, 7), dtype=np.float32)
+    model.fit(x, np.zeros((BATCH_SIZE, 1), dtype=np.float32), epochs=1, verbose=0)
+    model.predict(x, verbose=0)
+    lstm.keras.backend.clear_session()
+
+
+def run_arrow(lstm, data_dir: str, tmp: str, workers: int, steps: int):
+    predictor = lstm.MLDPredictor(data_dir, tmp)
+    X, y = predictor.prepare_features_parallel(n_workers=workers)
+    raw_bytes = X.nbytes + y.nbytes
+    predictor.train(X, y, time_steps=TIME_STEPS, epochs=1, batch_size=BATCH_SIZE, fit_scalers=False,
+                    inplace=True, callbacks=[_stop_after(lstm, steps)])
+    return raw_bytes
+
+
+def run_legacy(lstm, data_dir: str, tmp: str, workers: int, steps: int):
+    predictor = lstm.MLDPredictor(data_dir, tmp)
+    X, y = predictor.prepare_features(predictor.load_multiple_parquet_files())
+    raw_bytes = X.nbytes + y.nbytes
+    Xs, ys = predictor.scaler_X.fit_transform(X), predictor.scaler_y.fit_transform(y)
+    windows = np.array([Xs[i:i + TIME_STEPS] for i in range(len(Xs) - TIME_STEPS)])
+    targets = ys[TIME_STEPS:]
+    X_tr, X_te, y_tr, y_te = train_test_split(windows, targets, test_size=0.2, random_state=42)
+    model = predictor.build_lstm_model((TIME_STEPS, X.shape[1]))
+    model.fit(X_tr, y_tr, validation_split=0.2, epochs=1, batch_size=BATCH_SIZE,
+              callbacks=[_stop_after(lstm, steps)], verbose=0)
+    model.evaluate(X_te, y_te, batch_size=BATCH_SIZE, verbose=0)
+    model.predict(X_te, batch_size=BATCH_SIZE, verbose=0)
+    return raw_bytes
+
+
+def _rss_kb() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+# ---------- Driver ----------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", type=int, default=10_000)
+    parser.add_argument("--levels", type=int, default=100)
+    parser.add_argument("--copies", type=int, default=3, help="NODC cross-product copies of every level")
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=2, help="feature worker processes for the arrow path")
+    parser.add_argument("--steps", type=int, default=50, help="training batches before stopping")
+    parser.add_argument("--max-multiple", type=float, default=3.5,
+                        help="allowed peak RSS growth per float32 feature byte, above --fixed-mb")
+    parser.add_argument("--fixed-mb", type=float, default=175.0,
+                        help="allowance for the size-independent TF cost of training a fresh model")
+    parser.add_argument("--paths", nargs="+", default=["arrow", "legacy"], choices=["arrow", "legacy"])
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    parser.add_argument("--data", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        lstm = _load_lstm_module()
+        with tempfile.TemporaryDirectory() as tmp:
+            _warm_up(lstm, tmp)
+            # ru_maxrss is a high-water mark, so the baseline is the current RSS after the warm-up
+            base_kb = _rss_kb()
+            run = {"arrow": run_arrow, "legacy": run_legacy}[args.run]
+            raw_bytes = run(lstm, args.data, tmp, args.workers, args.steps)
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print("RESULT " + json.dumps({"path": args.run, "raw_bytes": raw_bytes,
+                                      "peak_bytes": (peak_kb - base_kb) * 1024}))
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        write_synthetic_dir(tmp, args.profiles, args.levels, args.copies, args.files)
+        for name in args.paths:
+            proc = subprocess.run([sys.executable, __file__, "--run", name, "--data", tmp,
+                                   "--workers", str(args.workers), "--steps", str(args.steps)],
+                                  capture_output=True, text=True)
+            lines = [l for l in proc.stdout.splitlines() if l.startswith("RESULT ")]
+            if proc.returncode or not lines:
+                print(f"[WARNING] {name} failed:\n{proc.stderr[-2000:]}")
+                continue
+            results[name] = json.loads(lines[-1][len("RESULT "):])
+
+    for name, r in results.items():
+        print(f"[RESULTS] {name:<7} features {r['raw_bytes'] / 1e6:8.1f} MB | peak RSS +{r['peak_bytes'] / 1e6:8.1f} MB "
+              f"({r['peak_bytes'] / r['raw_bytes']:.1f}x)")
+    if "arrow" not in results:
+        sys.exit(1)
+    arrow = results["arrow"]
+    multiple = (arrow["peak_bytes"] - args.fixed_mb * 1e6) / arrow["raw_bytes"]
+    if multiple > args.max_multiple:
+        print(f"[WARNING] arrow path peaked at {args.fixed_mb:.0f} MB + {multiple:.1f}x the feature bytes "
+              f"(limit {args.max_multiple}x)")
+        sys.exit(1)
+    print(f"[INFO] arrow path within {args.fixed_mb:.0f} MB + {args.max_multiple}x of the raw feature bytes "
+          f"({max(multiple, 0.0):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,53 +1,160 @@
+"""
+Random Forest Maximum Depth Prediction
+- Loads the bounding-box CSV with a columnar reader (only the needed columns, float32)
+- Trains once and persists the forest (optionally compact: pruned leaves + compressed file)
+  plus its held-out metrics (rf_max_depth_metrics.json, the baseline for incremental updates)
+- Vectorized batch prediction over files or arrays of bounding boxes
+
+Usage:
+    python OF-RandomForest.py train   [--data 202009.csv] [--model rf_max_depth.pkl] [--compact]
+    python OF-RandomForest.py predict --input boxes.parquet [--output predictions.parquet]
+    python OF-RandomForest.py predict --box LAT_MIN LAT_MAX LON_MIN LON_MAX DEPTH_MIN
+"""
+
+import argparse
+import json
+import os
+
+import joblib
+import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_squared_error, r2_score
-import joblib
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import train_test_split
+
+# --------- PATHS: adjust for your machine ---------
+DATA_PATH = "D:\\Documents\\ACADEMIC\\BTECH\\TY\\Sem-I_Mod-V\\EDAI-V\\OceanFront\\OF-Data\\202009.csv"
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rf_max_depth.pkl")
+# --------------------------------------------------
+
+FEATURES = ["latitude_min", "latitude_max", "longitude_min", "longitude_max", "depth_min"]
+TARGET = "depth_max"
+PREDICTION_CHUNK = 1_000_000
+
+
+# ---------- I/O ----------
+def load_boxes(path: str, with_target: bool = True) -> pd.DataFrame:
+    """
+    Read only the feature (+ target) columns as float32.
+    CSV goes through the multithreaded pyarrow parser instead of engine="python".
+    """
+    columns = FEATURES + ([TARGET] if with_target else [])
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        # Header names in the source CSV carry stray whitespace; match them after stripping
+        header = pd.read_csv(path, nrows=0).columns
+        rename = {c: c.strip() for c in header if c.strip() in columns}
+        df = pd.read_csv(path, usecols=list(rename), engine="pyarrow").rename(columns=rename)
+    df = df[columns].astype(np.float32)
+    print(f"[INFO] Loaded {os.path.basename(path)}: {len(df)} rows")
+    return df
+
+
+# ---------- Training ----------
+def train(data_path: str = DATA_PATH, model_path: str = MODEL_PATH, n_estimators: int = 200, compact: bool = False):
+    """
+    Train once and persist. compact=True grows shallower trees (min_samples_leaf=5) and
+    compresses the pickle, which shrinks the file and speeds up prediction at a small accuracy cost.
+    """
+    df = load_boxes(data_path)
+    X = df[FEATURES].to_numpy()
+    y = df[TARGET].to_numpy()
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    rf = RandomForestRegressor(
+        n_estimators=n_estimators,
+        min_samples_leaf=5 if compact else 1,
+        random_state=42,
+        n_jobs=-1,
+    )
+    print(f"[INFO] Training Random Forest ({n_estimators} trees{', compact' if compact else ''})...")
+    rf.fit(X_train, y_train)
+
+    y_pred = rf.predict(X_test)
+    mse = mean_squared_error(y_test, y_pred)
+    r2 = r2_score(y_test, y_pred)
+    print("Model Performance:")
+    print(f"MSE: {mse:.4f}")
+    print(f"R²: {r2:.4f}")
+
+    joblib.dump(rf, model_path, compress=3 if compact else 0)
+    print(f"[INFO] Saved model to {model_path} ({os.path.getsize(model_path) / 1e6:.1f} MB)")
+    metrics_path = os.path.splitext(model_path)[0] + "_metrics.json"
+    with open(metrics_path, "w") as f:
+        json.dump({"rmse": float(np.sqrt(mse)), "mae": float(mean_absolute_error(y_test, y_pred)),
+                   "r2": float(r2), "n_test": len(y_test)}, f, indent=2)
+    print(f"[INFO] Saved baseline metrics to {metrics_path}")
+    return rf, (mse, r2)
+
 
-# 1. Load dataset
-df = pd.read_csv("D:\\Documents\\ACADEMIC\\BTECH\\TY\\Sem-I_Mod-V\\EDAI-V\\OceanFront\\OF-Data\\202009.csv", sep=",", engine="python")
+def load_model(model_path: str = MODEL_PATH) -> RandomForestRegressor:
+    if not os.path.isfile(model_path):
+        raise FileNotFoundError(f"No model at {model_path}; run `train` first")
+    return joblib.load(model_path)
 
-# Clean column names
-df.columns = df.columns.str.strip()
 
-print("Columns available:", df.columns.tolist())  # Debug check
+# ---------- Prediction ----------
+def predict_batch(model: RandomForestRegressor, boxes, chunk_size: int = PREDICTION_CHUNK) -> np.ndarray:
+    """
+    Predict max depth for an (n, 5) array or DataFrame of bounding boxes (FEATURES order).
+    Trees are evaluated in parallel; rows go in chunks so memory stays bounded.
+    """
+    if isinstance(boxes, pd.DataFrame):
+        boxes = boxes[FEATURES].to_numpy()
+    X = np.ascontiguousarray(boxes, dtype=np.float32)
+    if X.ndim != 2 or X.shape[1] != len(FEATURES):
+        raise ValueError(f"Expected shape (n, {len(FEATURES)}) in order {FEATURES}, got {X.shape}")
+    model.set_params(n_jobs=-1)
+    out = np.empty(len(X), dtype=np.float32)
+    for start in range(0, len(X), chunk_size):
+        out[start:start + chunk_size] = model.predict(X[start:start + chunk_size])
+    return out
 
-# Define features/target
-features = ['latitude_min', 'latitude_max', 'longitude_min', 'longitude_max', 'depth_min']
-target = 'depth_max'
 
-X = df[features]
-y = df[target]
+def predict_file(model: RandomForestRegressor, input_path: str, output_path: str = None) -> pd.DataFrame:
+    df = load_boxes(input_path, with_target=False)
+    df["predicted_depth_max"] = predict_batch(model, df)
+    if output_path:
+        if output_path.endswith(".parquet"):
+            df.to_parquet(output_path, index=False)
+        else:
+            df.to_csv(output_path, index=False)
+        print(f"[INFO] Wrote {len(df)} predictions to {output_path}")
+    return df
 
-# 2. Train-test split
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-# 3. Train Random Forest model
-rf = RandomForestRegressor(n_estimators=200, random_state=42)
-rf.fit(X_train, y_train)
+def main():
+    parser = argparse.ArgumentParser(description="OceanFront max-depth Random Forest")
+    sub = parser.add_subparsers(dest="command", required=True)
 
-# 4. Evaluate model
-y_pred = rf.predict(X_test)
-mse = mean_squared_error(y_test, y_pred)
-r2 = r2_score(y_test, y_pred)
+    p_train = sub.add_parser("train", help="train once and persist the forest")
+    p_train.add_argument("--data", default=DATA_PATH)
+    p_train.add_argument("--model", default=MODEL_PATH)
+    p_train.add_argument("--trees", type=int, default=200)
+    p_train.add_argument("--compact", action="store_true", help="shallower trees + compressed model file")
 
-print("Model Performance:")
-print(f"MSE: {mse:.4f}")
-print(f"R²: {r2:.4f}")
+    p_pred = sub.add_parser("predict", help="batch prediction with a saved forest")
+    p_pred.add_argument("--model", default=MODEL_PATH)
+    group = p_pred.add_mutually_exclusive_group(required=True)
+    group.add_argument("--input", help="CSV/Parquet with the feature columns")
+    group.add_argument("--box", nargs=len(FEATURES), type=float, metavar="X", help=" ".join(FEATURES))
+    p_pred.add_argument("--output", help="where to write predictions (CSV or Parquet)")
 
-# 5. Get user input and make prediction
-print("\nEnter values for depth prediction:")
-latitude_min = float(input("Latitude Min: "))
-latitude_max = float(input("Latitude Max: "))
-longitude_min = float(input("Longitude Min: "))
-longitude_max = float(input("Longitude Max: "))
-depth_min = float(input("Depth Min: "))
+    args = parser.parse_args()
+    if args.command == "train":
+        train(args.data, args.model, n_estimators=args.trees, compact=args.compact)
+        return
 
-# Create input array for prediction
-user_input = [[latitude_min, latitude_max, longitude_min, longitude_max, depth_min]]
+    rf = load_model(args.model)
+    if args.box:
+        predicted = predict_batch(rf, [args.box])
+        print(f"\nPredicted Maximum Depth: {predicted[0]:.2f} meters")
+    else:
+        df = predict_file(rf, args.input, args.output)
+        if not args.output:
+            print(df.head())
 
-# Make prediction
-predicted_depth = rf.predict(user_input)
 
-print(f"\nPredicted Maximum Depth: {predicted_depth[0]:.2f} meters")
-print(f"Model Accuracy (R²): {r2:.4f}")
+if __name__ == "__main__":
+    main()
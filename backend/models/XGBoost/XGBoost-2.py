@@ -5,9 +5,10 @@ import pandas as pd
 import glob
 import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from xgboost import XGBRegressor
 import joblib
+import json
 import os
 
 # === 1️⃣ Locate and Load All Parquet Files ===
@@ -50,7 +51,8 @@ print("✅ Cleaned data. Remaining:", df.shape)
 # === 3️⃣ Convert Datetime Columns to Numeric ===
 if "juld" in df.columns:
     df["juld"] = pd.to_datetime(df["juld"], errors="coerce")
-    df["juld_numeric"] = (df["juld"] - df["juld"].min()).dt.total_seconds() / 86400.0
+    juld_origin = df["juld"].min()
+    df["juld_numeric"] = (df["juld"] - juld_origin).dt.total_seconds() / 86400.0
     df = df.drop(columns=["juld"])
     df = df.rename(columns={"juld_numeric": "juld"})
     print("✅ Converted 'juld' to numeric (days since start).")
@@ -115,3 +117,15 @@ print("\n✅ Model saved as OceanFront_XGBoost_Tz.pkl")
 # Save features for later inference
 joblib.dump(X.columns.tolist(), "OceanFront_XGBoost_Tz_features.pkl")
 print("✅ Saved feature column list for future predictions.")
+
+# Inference must measure juld from the same origin (pipeline.ensemble.XGBoostTzModel reads this)
+if "juld" in X.columns:
+    with open("OceanFront_XGBoost_Tz_meta.json", "w") as f:
+        json.dump({"juld_origin": pd.Timestamp(juld_origin).isoformat()}, f, indent=2)
+    print(f"✅ Saved juld origin ({juld_origin}) as OceanFront_XGBoost_Tz_meta.json")
+
+# Held-out metrics: the baseline incremental updates are checked against
+with open("OceanFront_XGBoost_Tz_metrics.json", "w") as f:
+    json.dump({"rmse": float(np.sqrt(mse)), "mae": float(mean_absolute_error(y_test, y_pred)),
+               "r2": float(r2), "n_test": len(y_test)}, f, indent=2)
+print("✅ Saved held-out metrics as OceanFront_XGBoost_Tz_metrics.json")
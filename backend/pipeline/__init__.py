@@ -0,0 +1,25 @@
+"""
+OceanFront data pipeline
+- Compact columnar storage for Argo profiles
+- Vectorized QC filtering
+- Multi-core per-file feature preparation
+- Incremental (warm-start) model updates with drift checks
+- Thermocline / halocline detection
+- Space-time nearest-neighbour profile index
+- Multi-model scoring over one shared feature pass
+"""
+
+from .clines import detect_clines
+from .ensemble import EnsembleEngine, EnsembleResult, SharedFeatures
+from .features import compute_mld, level_features
+from .incremental import UpdateReport, finetune_lstm, update_random_forest, update_xgboost
+from .parallel import FeatureSet, ParallelFeatureExecutor
+from .profile_store import ProfileStore
+from .qc import QCPolicy, QCResult, apply_qc
+from .spatial_index import ProfileIndex
+
+__all__ = [
+    "EnsembleEngine", "EnsembleResult", "FeatureSet", "ParallelFeatureExecutor", "ProfileIndex", "ProfileStore",
+    "QCPolicy", "QCResult", "SharedFeatures", "UpdateReport",
+    "apply_qc", "compute_mld", "detect_clines", "finetune_lstm", "level_features", "update_random_forest", "update_xgboost",
+]
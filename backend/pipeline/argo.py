@@ -0,0 +1,60 @@
+"""
+Argo schema helpers shared by the pipeline modules
+- Resolve pres/temp/psal (preferring *_adjusted) to generic names
+- Robust JULD → UTC datetime conversion
+- Byte-string metadata cleanup
+"""
+
+import numpy as np
+import pandas as pd
+
+MEASUREMENTS = ("depth", "temperature", "salinity")
+# generic name → Argo variable (the *_adjusted column is preferred when present)
+ARGO_VARIABLES = {"depth": "pres", "temperature": "temp", "salinity": "psal"}
+# per-profile categorical metadata kept on the store (the XGBoost Tz model one-hot encodes these)
+PROFILE_CATEGORIES = ("data_mode", "platform_type", "vertical_sampling_scheme",
+                      "profile_pres_qc", "profile_temp_qc", "profile_psal_qc")
+
+
+def resolve_argo_columns(columns) -> dict:
+    """
+    Map generic names to the Argo columns present in a frame,
+    e.g. {"depth": "pres_adjusted", "temperature": "temp_adjusted", ...}.
+    """
+    columns = set(columns)
+    resolved, missing = {}, []
+    for name, var in ARGO_VARIABLES.items():
+        if f"{var}_adjusted" in columns:
+            resolved[name] = f"{var}_adjusted"
+        elif var in columns:
+            resolved[name] = var
+        elif name in columns:
+            resolved[name] = name
+        else:
+            missing.append(f"{var}/{var}_adjusted")
+    if missing:
+        raise ValueError(f"Argo variables missing: {missing}")
+    return resolved
+
+
+def clean_strings(values: np.ndarray) -> pd.Categorical:
+    """Decode byte strings, strip Argo fixed-width padding and store as categorical."""
+    s = pd.Series(values)
+    if s.dtype == object and s.map(type).eq(bytes).any():
+        s = s.str.decode("ascii", errors="ignore")
+    return pd.Categorical(s.astype("string").str.strip())
+
+
+def argo_datetime(values) -> pd.Series:
+    """
+    Robust JULD → UTC datetime.
+    Supports numeric days-since-1950, strings, or datetime-like values.
+    """
+    j = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(j):
+        return pd.to_datetime(j, utc=True, errors="coerce")
+    j_num = pd.to_numeric(j, errors="coerce")
+    if j_num.notna().any():
+        origin = pd.Timestamp("1950-01-01", tz="UTC")
+        return origin + pd.to_timedelta(j_num.astype(float), unit="D")
+    return pd.to_datetime(j, utc=True, errors="coerce")
@@ -0,0 +1,122 @@
+"""
+Thermocline / halocline detection over batched profiles
+- dT/dz and dS/dz between adjacent levels of every profile at once (no per-profile loop)
+- Per profile: depth of the strongest gradient, its strength and the thickness of the
+  gradient layer (contiguous levels with |gradient| >= layer_fraction * max)
+- Works on ProfileStore segments or on dense (n_profiles, n_levels) / standard-level arrays
+- Output is a per-profile feature table for the models and analytics queries
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _segments_from_dense(depth, temperature, salinity):
+    """(n_prof, n_levels) arrays (depth may be 1-D standard levels) → CSR offsets + flat depth-sorted levels."""
+    temperature = np.asarray(temperature, dtype=np.float32)
+    salinity = np.asarray(salinity, dtype=np.float32)
+    depth = np.broadcast_to(np.asarray(depth, dtype=np.float32), temperature.shape)
+    valid = np.isfinite(depth)
+    idx = np.argsort(np.where(valid, depth, np.inf), axis=1, kind="stable")
+    valid = np.take_along_axis(valid, idx, axis=1)
+    offsets = np.r_[0, np.cumsum(valid.sum(axis=1))].astype(np.int64)
+
+    def take(a):
+        return np.take_along_axis(a, idx, axis=1)[valid]
+
+    return offsets, take(depth), take(temperature), take(salinity)
+
+
+def _cline(offsets, depth, values, min_depth, max_depth, min_dz, layer_fraction):
+    """Core gradient analysis for one variable; returns (depth, thickness, strength, gradient) per profile."""
+    n_prof = offsets.size - 1
+    out = {k: np.full(n_prof, np.nan, dtype=np.float32) for k in ("depth", "thickness", "strength", "gradient")}
+    lengths = np.diff(offsets)
+    if depth.size < 2:
+        return out
+
+    # Adjacent-level pairs that lie inside the same profile
+    pidx = np.repeat(np.arange(n_prof, dtype=np.int64), lengths)
+    same = pidx[:-1] == pidx[1:]
+    upper = np.flatnonzero(same)
+    pair_prof = pidx[upper]
+    z_top, z_bot = depth[upper], depth[upper + 1]
+    dz = z_bot - z_top
+    grad = (values[upper + 1] - values[upper]) / np.where(dz > 0, dz, np.nan)
+    z_mid = 0.5 * (z_top + z_bot)
+    usable = np.isfinite(grad) & (dz >= min_dz) & (z_mid >= min_depth)
+    if max_depth is not None:
+        usable &= z_mid <= max_depth
+    mag = np.where(usable, np.abs(grad), -np.inf)
+
+    pair_counts = np.maximum(lengths - 1, 0)
+    pair_start = np.r_[0, np.cumsum(pair_counts)[:-1]]
+    has_pairs = pair_counts > 0
+
+    # Strongest pair per profile: lexsort by (profile, -|grad|) puts it at each segment start
+    order = np.lexsort((-mag, pair_prof))
+    best = np.full(n_prof, -1, dtype=np.int64)
+    best[has_pairs] = order[pair_start[has_pairs]]
+    found = has_pairs.copy()
+    found[has_pairs] = mag[best[has_pairs]] > 0   # flat (or all-unusable) profiles have no cline
+    b = best[found]
+
+    strength = mag[b]
+    out["strength"][found] = strength
+    out["gradient"][found] = grad[b]
+    out["depth"][found] = z_mid[b]
+
+    # Gradient layer: the contiguous run of strong pairs around the maximum, bounded by the profile
+    n_pairs = upper.size
+    pos = np.arange(n_pairs, dtype=np.int64)
+    threshold = np.full(n_prof, np.inf, dtype=np.float32)
+    threshold[found] = layer_fraction * strength
+    strong = mag >= threshold[pair_prof]
+    first_pair = np.r_[True, pair_prof[1:] != pair_prof[:-1]]
+    last_pair = np.r_[pair_prof[1:] != pair_prof[:-1], True]
+
+    prev_break = np.where(~strong, pos, -1)
+    prev_break = np.where(first_pair, np.maximum(prev_break, pos - 1), prev_break)
+    prev_break = np.maximum.accumulate(prev_break)
+    next_break = np.where(~strong, pos, n_pairs)
+    next_break = np.where(last_pair, np.minimum(next_break, pos + 1), next_break)
+    next_break = np.minimum.accumulate(next_break[::-1])[::-1]
+
+    run_lo, run_hi = prev_break[b] + 1, next_break[b] - 1
+    out["thickness"][found] = z_bot[run_hi] - z_top[run_lo]
+    return out
+
+
+def detect_clines(store=None, *, depth=None, temperature=None, salinity=None, min_depth: float = 10.0,
+                  max_depth: float = None, min_dz: float = 1.0, layer_fraction: float = 0.5) -> pd.DataFrame:
+    """
+    Thermocline and halocline per profile.
+
+    Pass a ProfileStore, or dense arrays: temperature/salinity shaped (n_profiles, n_levels) and
+    depth either the same shape or 1-D standard levels.
+    Pairs shallower than min_depth (surface noise) or thinner than min_dz are ignored.
+
+    Columns: thermocline_depth [m], thermocline_thickness [m], thermocline_strength [°C/m],
+    thermocline_gradient (signed dT/dz) and the same four for the halocline [PSU/m].
+    With a store, its per-profile metadata (profile_id, latitude, longitude, date_time, ...) is included.
+    """
+    if store is not None:
+        offsets, z, t, s = store.offsets, store.depth, store.temperature, store.salinity
+        table = store.profiles_frame()
+    else:
+        if depth is None or temperature is None or salinity is None:
+            raise ValueError("Pass a ProfileStore or depth/temperature/salinity arrays")
+        offsets, z, t, s = _segments_from_dense(depth, temperature, salinity)
+        table = pd.DataFrame({"n_levels": np.diff(offsets)})
+
+    for prefix, values in (("thermocline", t), ("halocline", s)):
+        res = _cline(offsets, z, values, min_depth, max_depth, min_dz, layer_fraction)
+        for key, arr in res.items():
+            table[f"{prefix}_{key}"] = arr
+    return table
+
+
+def write_cline_table(table: pd.DataFrame, path: str):
+    """Persist the per-profile table (Parquet) for the models and analytics queries."""
+    table.to_parquet(path, index=False)
+    print(f"[INFO] Wrote thermocline/halocline features for {len(table)} profiles to {path}")
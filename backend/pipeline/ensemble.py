@@ -0,0 +1,336 @@
+"""
+Multi-target scoring over one shared feature pass
+- A batch of profiles (raw Argo frame, Parquet path or ProfileStore) is normalized,
+  QC-filtered and featurized once
+- Every registered model reads the same arrays: XGBoost Tz (per level), LSTM MLD
+  (per level → per profile) and RandomForest max depth (per profile)
+- Models run concurrently in threads (XGBoost, TF and sklearn trees release the GIL)
+- Returns one per-profile table (MLD, max depth) and one per-level table (Tz)
+"""
+
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from .argo import PROFILE_CATEGORIES
+from .features import FEATURE_COLUMNS, compute_mld, sliding_windows
+from .incremental import align_xgboost_features
+from .parallel import minmax_inplace, read_argo_parquet
+from .profile_store import ProfileStore
+from .qc import QCPolicy
+
+
+
+# ---------- Shared features ----------
+class SharedFeatures:
+    """
+    Everything the registered models need, computed once per batch from a QC-filtered store.
+
+    levels:       float32 (n_levels, 7) in FEATURE_COLUMNS order, store order (profile, depth)
+    level_ok:     rows of `levels` without NaNs
+    time_order:   level rows ordered by profile time (the order the LSTM was trained on)
+    mld_rule:     threshold MLD per profile (the LSTM's training target)
+    depth_min:    shallowest valid level per profile
+    """
+
+    def __init__(self, store: ProfileStore, threshold: float = 0.5, ref_depth: float = 10.0):
+        self.store = store
+        pidx = store.profile_index()
+        meta = store.meta
+
+        if "date_time" in meta:
+            times = pd.DatetimeIndex(meta["date_time"])
+            month = times.month.to_numpy(dtype=np.float32, na_value=np.nan)
+            doy = times.dayofyear.to_numpy(dtype=np.float32, na_value=np.nan)
+            time_ns = np.asarray(meta["date_time"], dtype="datetime64[ns]").view(np.int64)
+        else:
+            month = doy = np.full(len(store), np.nan, dtype=np.float32)
+            time_ns = np.zeros(len(store), dtype=np.int64)
+
+        per_level = {
+            "temperature": store.temperature,
+            "salinity": store.salinity,
+            "latitude": meta["latitude"].astype(np.float32)[pidx],
+            "longitude": meta["longitude"].astype(np.float32)[pidx],
+            "month": month[pidx],
+            "day_of_year": doy[pidx],
+            "depth": store.depth,
+        }
+        self.levels = np.empty((store.n_levels, len(FEATURE_COLUMNS)), dtype=np.float32)
+        for j, name in enumerate(FEATURE_COLUMNS):
+            self.levels[:, j] = per_level[name]
+        self.level_ok = ~np.isnan(self.levels).any(axis=1)
+        self.time_order = np.argsort(time_ns[pidx], kind="stable")
+        self.mld_rule = compute_mld(store, threshold, ref_depth)
+        self.depth_min = store.reduce("depth", np.fmin)
+
+    def __repr__(self) -> str:
+        return (f"SharedFeatures(profiles={len(self.store)}, levels={self.store.n_levels}, "
+                f"valid_levels={int(self.level_ok.sum())})")
+
+
+# ---------- Model adapters ----------
+def _onehot_names(col: str, value: str) -> set:
+    """
+    Names XGBoost-2.py can have given one category after get_dummies and its column-name cleanup:
+    decoded strings, raw bytes, and raw bytes whose fixed-width padding collapsed to one "_".
+    """
+    names = (f"{col}_{value}", f"{col}_b'{value}'", f"{col}_b'{value} '")
+    return {re.sub(r"\s+", "_", re.sub(r"[\[\]<>]", "", n)) for n in names}
+
+
+class XGBoostTzModel:
+    """
+    Temperature at each level from OceanFront_XGBoost_Tz.pkl (XGBoost-2.py).
+    juld_origin: the training set's earliest date, read from OceanFront_XGBoost_Tz_meta.json when
+                 not given; without either, juld counts from the batch's earliest profile.
+    """
+
+    name = "tz"
+    level = "level"
+
+    def __init__(self, model_path: str, features_path: str = None, juld_origin=None, meta_path: str = None):
+        self.model = joblib.load(model_path)
+        if features_path is None:
+            features_path = model_path.replace(".pkl", "_features.pkl")
+        self.feature_names = joblib.load(features_path) if os.path.isfile(features_path) else None
+        if juld_origin is None:
+            meta_path = meta_path or model_path.replace(".pkl", "_meta.json")
+            if os.path.isfile(meta_path):
+                with open(meta_path) as f:
+                    juld_origin = json.load(f).get("juld_origin")
+            else:
+                print(f"[WARNING] No juld origin at {meta_path}; juld counts from each batch's earliest profile")
+        if juld_origin is not None:
+            juld_origin = pd.Timestamp(juld_origin)
+            juld_origin = juld_origin.tz_convert(None) if juld_origin.tz is not None else juld_origin
+        self.juld_origin = juld_origin
+
+    def frame(self, features: SharedFeatures) -> pd.DataFrame:
+        store = features.store
+        pidx = store.profile_index()
+        cols = {
+            "latitude": features.levels[:, FEATURE_COLUMNS.index("latitude")],
+            "longitude": features.levels[:, FEATURE_COLUMNS.index("longitude")],
+            "pres_adjusted": store.depth,
+            "psal_adjusted": store.salinity,
+        }
+        if "date_time" in store.meta:
+            times = np.asarray(store.meta["date_time"], dtype="datetime64[ns]")
+            origin = np.datetime64(self.juld_origin, "ns") if self.juld_origin is not None else times.min()
+            cols["juld"] = ((times - origin) / np.timedelta64(1, "D")).astype(np.float64)[pidx]
+        X = pd.DataFrame(cols)
+        for col in PROFILE_CATEGORIES:
+            if col in store.meta:
+                codes = pd.Categorical(store.meta[col])
+                per_level = codes.codes[pidx]
+                for code, value in enumerate(codes.categories):
+                    hit = (per_level == code).astype(np.uint8)
+                    for name in _onehot_names(col, str(value)):
+                        X[name] = X[name] | hit if name in X else hit
+        if self.feature_names is not None:
+            X = align_xgboost_features(X, self.feature_names)
+        return X
+
+    def predict(self, features: SharedFeatures) -> np.ndarray:
+        return np.asarray(self.model.predict(self.frame(features)), dtype=np.float32)
+
+
+class LSTMMLDModel:
+    """
+    Mixed layer depth from the LSTM-2.py model: windows of time_steps time-ordered levels,
+    one prediction per level (NaN for the first time_steps), reduced to the per-profile median.
+    """
+
+    name = "mld"
+    level = "profile"
+
+    def __init__(self, model_path: str, scaler_X_path: str, scaler_y_path: str, time_steps: int = 30,
+                 batch_size: int = 1024):
+        from tensorflow import keras
+
+        self.model = keras.models.load_model(model_path)
+        self.scaler_X = joblib.load(scaler_X_path)
+        self.scaler_y = joblib.load(scaler_y_path)
+        self.time_steps = time_steps
+        self.batch_size = batch_size
+
+    def predict(self, features: SharedFeatures) -> np.ndarray:
+        store = features.store
+        rows = features.time_order[features.level_ok[features.time_order]]
+        per_level = np.full(store.n_levels, np.nan, dtype=np.float32)
+        if rows.size > self.time_steps:
+            X = minmax_inplace(self.scaler_X, features.levels[rows])   # the gather is the only copy
+            windows, _ = sliding_windows(X, X, self.time_steps)
+            y = self.model.predict(windows, batch_size=self.batch_size, verbose=0)
+            per_level[rows[self.time_steps:]] = self.scaler_y.inverse_transform(y).ravel()
+
+        # Median over each profile's predicted levels; profiles with none stay NaN
+        pidx = store.profile_index()
+        has = ~np.isnan(per_level)
+        out = np.full(len(store), np.nan, dtype=np.float32)
+        if has.any():
+            frame = pd.DataFrame({"p": pidx[has], "v": per_level[has]})
+            med = frame.groupby("p", sort=False)["v"].median()
+            out[med.index.to_numpy()] = med.to_numpy()
+        return out
+
+
+class RandomForestMaxDepthModel:
+    """
+    Maximum depth from rf_max_depth.pkl (OF-RandomForest.py). Each profile is a point box
+    (lat_min = lat_max, lon_min = lon_max) starting at its shallowest valid level.
+    """
+
+    name = "max_depth"
+    level = "profile"
+
+    def __init__(self, model_path: str):
+        self.model = joblib.load(model_path)
+
+    def predict(self, features: SharedFeatures) -> np.ndarray:
+        meta = features.store.meta
+        lat = np.asarray(meta["latitude"], dtype=np.float32)
+        lon = np.asarray(meta["longitude"], dtype=np.float32)
+        boxes = np.column_stack([lat, lat, lon, lon, features.depth_min])
+        out = np.full(len(lat), np.nan, dtype=np.float32)
+        ok = ~np.isnan(boxes).any(axis=1)
+        if ok.any():
+            out[ok] = self.model.predict(boxes[ok])
+        return out
+
+
+def default_models(models_dir: str, time_steps: int = 30, lstm_name: str = "lstm_mld_model") -> list:
+    """
+    Adapters for every trained model found under backend/models (missing files are skipped)
+    - lstm_name: LSTM artifact to score (<name>.keras + <name>_scaler_X/Y.pkl); the default is the
+      exported model that MLDPredictor.save_model writes and MLDPredictor.finetune updates in place
+    """
+    lstm_dir = os.path.join(models_dir, "LSTM")
+    candidates = [
+        (XGBoostTzModel, [os.path.join(models_dir, "XGBoost", "OceanFront_XGBoost_Tz.pkl")], {}),
+        (LSTMMLDModel, [os.path.join(lstm_dir, f"{lstm_name}.keras"),
+                        os.path.join(lstm_dir, f"{lstm_name}_scaler_X.pkl"),
+                        os.path.join(lstm_dir, f"{lstm_name}_scaler_Y.pkl")], {"time_steps": time_steps}),
+        (RandomForestMaxDepthModel, [os.path.join(models_dir, "RandomForest", "rf_max_depth.pkl")], {}),
+    ]
+    models = []
+    for cls, paths, kwargs in candidates:
+        if not all(os.path.isfile(p) for p in paths):
+            print(f"[WARNING] Skipping {cls.name}: missing {[p for p in paths if not os.path.isfile(p)]}")
+            continue
+        try:
+            models.append(cls(*paths, **kwargs))
+        except ImportError as e:
+            print(f"[WARNING] Skipping {cls.name}: {e}")
+    return models
+
+
+# ---------- Engine ----------
+class EnsembleResult:
+    """profiles: one row per profile (id, position, time, mld_rule + profile-level predictions);
+    levels: one row per level (profile_id, depth, observed temperature/salinity + level-level predictions)."""
+
+    def __init__(self, profiles: pd.DataFrame, levels: pd.DataFrame, timings: dict, errors: dict):
+        self.profiles = profiles
+        self.levels = levels
+        self.timings = timings
+        self.errors = errors
+
+    def summary(self) -> str:
+        parts = [f"{name} {t * 1000:.0f} ms" for name, t in self.timings.items()]
+        msg = f"[INFO] Scored {len(self.profiles)} profiles / {len(self.levels)} levels ({', '.join(parts)})"
+        for name, err in self.errors.items():
+            msg += f"\n[WARNING] {name} failed: {err}"
+        return msg
+
+
+class EnsembleEngine:
+    """
+    models:     adapters with .name, .level ("level" | "profile") and .predict(SharedFeatures)
+    qc_policy:  QC applied once before featurization
+    n_threads:  model dispatch threads; 1 → sequential, None → one per model
+    """
+
+    def __init__(self, models=None, qc_policy: QCPolicy = None, mld_threshold: float = 0.5,
+                 ref_depth: float = 10.0, n_threads: int = None):
+        self.models = {}
+        for model in models or []:
+            self.register(model)
+        self.qc_policy = qc_policy or QCPolicy()
+        self.mld_threshold = mld_threshold
+        self.ref_depth = ref_depth
+        self.n_threads = n_threads
+
+    def register(self, model):
+        if model.level not in ("level", "profile"):
+            raise ValueError(f"Model {model.name} has unknown output level {model.level!r}")
+        self.models[model.name] = model
+        return model
+
+    def featurize(self, data) -> SharedFeatures:
+        """Raw Argo DataFrame, Parquet path or ProfileStore → QC-filtered SharedFeatures."""
+        if isinstance(data, str):
+            data = read_argo_parquet(data)
+        elif isinstance(data, pd.DataFrame):
+            data = ProfileStore.from_frame(data)
+        store, qc = data.filter_qc(self.qc_policy)
+        print(qc.summary())
+        return SharedFeatures(store, self.mld_threshold, self.ref_depth)
+
+    def _run(self, model, features):
+        start = time.perf_counter()
+        try:
+            return model.predict(features), None, time.perf_counter() - start
+        except Exception as e:
+            return None, f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+    def predict(self, data, names=None) -> EnsembleResult:
+        """Score a batch with every registered model (or just `names`) on one feature pass."""
+        start = time.perf_counter()
+        features = data if isinstance(data, SharedFeatures) else self.featurize(data)
+        timings = {"features": time.perf_counter() - start}
+        models = [self.models[n] for n in (names or self.models) if n in self.models]
+
+        n_threads = self.n_threads or len(models)
+        if n_threads > 1 and len(models) > 1:
+            with ThreadPoolExecutor(max_workers=n_threads) as pool:
+                outputs = list(pool.map(lambda m: self._run(m, features), models))
+        else:
+            outputs = [self._run(m, features) for m in models]
+
+        store = features.store
+        meta = store.meta
+        profiles = pd.DataFrame({
+            "profile_id": np.asarray(meta["profile_id"], dtype=np.int64),
+            "latitude": meta["latitude"],
+            "longitude": meta["longitude"],
+        })
+        if "date_time" in meta:
+            profiles["date_time"] = pd.to_datetime(meta["date_time"], utc=True)
+        profiles["mld_rule"] = features.mld_rule
+        levels = pd.DataFrame({
+            "profile_id": profiles["profile_id"].to_numpy()[store.profile_index()],
+            "depth": store.depth,
+            "temperature": store.temperature,
+            "salinity": store.salinity,
+        })
+
+        errors = {}
+        for model, (values, error, elapsed) in zip(models, outputs):
+            timings[model.name] = elapsed
+            if error is not None:
+                errors[model.name] = error
+                continue
+            (levels if model.level == "level" else profiles)[model.name] = values
+        timings["total"] = time.perf_counter() - start
+
+        result = EnsembleResult(profiles, levels, timings, errors)
+        print(result.summary())
+        return result
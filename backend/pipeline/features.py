@@ -0,0 +1,107 @@
+"""
+Feature construction on ProfileStore segments
+- Vectorized temperature-threshold Mixed Layer Depth (no per-profile Python loop)
+- Per-level feature table (same columns as MLDPredictor.prepare_features)
+- Zero-copy sliding windows for sequence models
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+FEATURE_COLUMNS = ["temperature", "salinity", "latitude", "longitude", "month", "day_of_year", "depth"]
+TARGET_COLUMN = "mixed_layer_depth"
+
+
+def compute_mld(store, threshold: float = 0.5, ref_depth: float = 10.0) -> np.ndarray:
+    """
+    Temperature-threshold MLD per profile (levels must be depth-sorted, as ProfileStore keeps them):
+    MLD = first depth where |T(z) - T(ref_depth)| > threshold, else the deepest level.
+    Empty profiles get NaN.
+    """
+    n_prof = len(store)
+    mld = np.full(n_prof, np.nan, dtype=np.float32)
+    if store.n_levels == 0:
+        return mld
+
+    starts, ends = store.offsets[:-1], store.offsets[1:]
+    nonempty = ends > starts
+    pidx = store.profile_index()
+
+    # Reference level: first level with minimal |depth - ref_depth| in each profile.
+    # lexsort by (profile, distance) puts each profile's closest level at its segment start.
+    dist = np.abs(store.depth - np.float32(ref_depth))
+    dist = np.where(np.isnan(dist), np.inf, dist)
+    order = np.lexsort((dist, pidx))
+    t_ref = np.full(n_prof, np.nan, dtype=np.float32)
+    t_ref[nonempty] = store.temperature[order[starts[nonempty]]]
+
+    # First level exceeding the threshold; n_levels acts as "none found"
+    exceed = np.abs(store.temperature - t_ref[pidx]) > threshold
+    level = np.where(exceed, np.arange(store.n_levels, dtype=np.int64), store.n_levels)
+    first = np.full(n_prof, store.n_levels, dtype=np.int64)
+    first[nonempty] = np.minimum.reduceat(level, starts[nonempty])
+
+    found = nonempty & (first < ends)
+    mld[found] = store.depth[first[found]]
+    last = nonempty & ~found
+    mld[last] = store.depth[ends[last] - 1]
+    return mld
+
+
+def level_features(store, threshold: float = 0.5, ref_depth: float = 10.0, dropna: bool = True) -> pa.Table:
+    """
+    One row per level: FEATURE_COLUMNS + mixed_layer_depth (float32), plus profile_id and
+    date_time (int64 ns since epoch, NaT → min int64) for global ordering.
+    Rows with any NaN feature/target are dropped when dropna=True.
+    """
+    pidx = store.profile_index()
+    mld = compute_mld(store, threshold, ref_depth)
+
+    if "date_time" in store.meta:
+        times = pd.DatetimeIndex(store.meta["date_time"])
+        month = times.month.to_numpy(dtype=np.float32, na_value=np.nan)
+        doy = times.dayofyear.to_numpy(dtype=np.float32, na_value=np.nan)
+        time_ns = np.asarray(store.meta["date_time"], dtype="datetime64[ns]").view(np.int64)
+    else:
+        month = doy = np.full(len(store), np.nan, dtype=np.float32)
+        time_ns = np.full(len(store), np.iinfo(np.int64).min, dtype=np.int64)
+
+    columns = {
+        "temperature": store.temperature,
+        "salinity": store.salinity,
+        "latitude": store.meta["latitude"].astype(np.float32)[pidx],
+        "longitude": store.meta["longitude"].astype(np.float32)[pidx],
+        "month": month[pidx],
+        "day_of_year": doy[pidx],
+        "depth": store.depth,
+        TARGET_COLUMN: mld[pidx],
+    }
+    extra = {
+        "profile_id": np.asarray(store.meta["profile_id"], dtype=np.int64)[pidx],
+        "date_time": time_ns[pidx],
+    }
+
+    if dropna:
+        keep = np.ones(store.n_levels, dtype=bool)
+        for values in columns.values():
+            keep &= ~np.isnan(values)
+        if not keep.all():
+            columns = {k: v[keep] for k, v in columns.items()}
+            extra = {k: v[keep] for k, v in extra.items()}
+
+    columns.update(extra)
+    return pa.table(columns)
+
+
+def sliding_windows(X: np.ndarray, y: np.ndarray, time_steps: int = 30):
+    """
+    Windows X[i:i+time_steps] → y[i+time_steps] for i in 0..len(X)-time_steps-1, as a strided
+    (n, time_steps, features) view over X: no window is copied until a batch is gathered from it.
+    """
+    n = max(len(X) - time_steps, 0)
+    if n == 0:
+        return np.empty((0, time_steps, X.shape[1]), dtype=X.dtype), y[:0]
+    # (n+1, features, time_steps) → (n, time_steps, features); the last window has no target
+    windows = np.lib.stride_tricks.sliding_window_view(X, time_steps, axis=0)[:n].transpose(0, 2, 1)
+    return windows, y[time_steps:time_steps + n]
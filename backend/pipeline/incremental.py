@@ -0,0 +1,290 @@
+"""
+Incremental model updates as new Argo cycles arrive
+- XGBoost Tz: continue boosting the saved booster with new trees on the new data; new Parquet
+  files are featurized with the scoring adapter (ensemble.XGBoostTzModel) so one-hots and the
+  juld origin match training
+- LSTM MLD: fine-tune the saved .keras model for a few epochs at a low learning rate
+- RandomForest max depth: add trees via warm_start, retiring the oldest past max_trees
+- Drift / accuracy checks on a held-out set decide whether the update is kept
+  and whether a full retrain is needed
+- Accuracy is compared with the held-out metrics saved next to each model at train time
+  (<model>_metrics.json), so slow degradation across many accepted updates is caught
+"""
+
+import json
+import os
+import shutil
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+
+# ---------- Checks ----------
+def regression_metrics(y_true, y_pred) -> dict:
+    y_true = np.asarray(y_true, dtype=np.float64).ravel()
+    y_pred = np.asarray(y_pred, dtype=np.float64).ravel()
+    return {
+        "rmse": float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        "mae": float(mean_absolute_error(y_true, y_pred)),
+    }
+
+
+def population_stability(reference, current, bins: int = 10) -> np.ndarray:
+    """
+    Population Stability Index per feature column (bins from reference quantiles).
+    Rule of thumb: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 significant shift.
+    """
+    reference = np.asarray(reference, dtype=np.float64)
+    current = np.asarray(current, dtype=np.float64)
+    if reference.ndim == 1:
+        reference, current = reference[:, None], current[:, None]
+    psi = np.zeros(reference.shape[1])
+    for j in range(reference.shape[1]):
+        ref, cur = reference[:, j], current[:, j]
+        ref, cur = ref[np.isfinite(ref)], cur[np.isfinite(cur)]
+        if ref.size == 0 or cur.size == 0:
+            continue
+        edges = np.unique(np.quantile(ref, np.linspace(0, 1, bins + 1)))
+        if edges.size < 2:
+            continue
+        edges[0], edges[-1] = -np.inf, np.inf
+        p = np.histogram(ref, edges)[0] / ref.size
+        q = np.histogram(cur, edges)[0] / cur.size
+        p, q = np.clip(p, 1e-6, None), np.clip(q, 1e-6, None)
+        psi[j] = float(np.sum((q - p) * np.log(q / p)))
+    return psi
+
+
+# ---------- Baseline metrics ----------
+def metrics_path(model_path: str) -> str:
+    """Sidecar next to a model file: rf_max_depth.pkl → rf_max_depth_metrics.json."""
+    return os.path.splitext(model_path)[0] + "_metrics.json"
+
+
+def save_baseline_metrics(model_path: str, metrics: dict, **extra) -> str:
+    """Write the held-out metrics of a full training run next to the model."""
+    path = metrics_path(model_path)
+    with open(path, "w") as f:
+        json.dump({**{k: float(v) for k, v in metrics.items()}, **extra}, f, indent=2)
+    print(f"[INFO] Saved baseline metrics to {path}")
+    return path
+
+
+def load_baseline_metrics(model_path: str):
+    """Held-out metrics saved at train time, or None if the model predates the sidecar."""
+    path = metrics_path(model_path)
+    if not os.path.isfile(path):
+        print(f"[WARNING] No baseline metrics at {path}; accuracy-degradation check skipped")
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _with_baseline(model_path: str, report_kwargs: dict) -> dict:
+    if report_kwargs.get("baseline_rmse") is None:
+        baseline = load_baseline_metrics(model_path)
+        if baseline is not None:
+            report_kwargs = {**report_kwargs, "baseline_rmse": baseline["rmse"]}
+    return report_kwargs
+
+
+class UpdateReport:
+    """
+    Held-out metrics before/after an incremental update plus feature drift.
+
+    accepted:             the updated model is at least as good as before (within tolerance)
+    degraded:             even the better of the two is worse than the train-time baseline_rmse
+                          by more than max_degradation (never set without a baseline)
+    needs_full_retrain:   drift or accuracy loss is beyond what incremental updates should absorb
+    """
+
+    def __init__(self, model_name, before, after, psi=None, feature_names=None,
+                 tolerance=0.02, max_psi=0.25, max_degradation=0.15, baseline_rmse=None):
+        self.model_name = model_name
+        self.before = before
+        self.after = after
+        self.psi = psi if psi is not None else np.zeros(0)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+        self.baseline_rmse = baseline_rmse
+        self.accepted = after["rmse"] <= before["rmse"] * (1 + tolerance)
+        self.drifted = bool(self.psi.size and self.psi.max() > max_psi)
+        best = min(before["rmse"], after["rmse"])
+        self.degraded = baseline_rmse is not None and best > baseline_rmse * (1 + max_degradation)
+
+    @property
+    def needs_full_retrain(self) -> bool:
+        return self.drifted or self.degraded
+
+    def summary(self) -> str:
+        lines = [
+            f"[RESULTS] {self.model_name}: RMSE {self.before['rmse']:.4f} → {self.after['rmse']:.4f} "
+            f"| MAE {self.before['mae']:.4f} → {self.after['mae']:.4f} "
+            f"| update {'accepted' if self.accepted else 'rejected'}",
+        ]
+        if self.baseline_rmse is not None:
+            lines.append(f"[INFO] Train-time baseline RMSE: {self.baseline_rmse:.4f}")
+        if self.psi.size:
+            j = int(np.argmax(self.psi))
+            name = self.feature_names[j] if self.feature_names else f"feature {j}"
+            lines.append(f"[INFO] Max feature drift (PSI): {self.psi[j]:.3f} on {name}")
+        if self.needs_full_retrain:
+            reason = "feature drift" if self.drifted else "accuracy degraded vs. baseline"
+            lines.append(f"[WARNING] Full retrain recommended ({reason})")
+        return "\n".join(lines)
+
+
+def _backup_and_save(save, path: str):
+    if os.path.isfile(path):
+        shutil.copy2(path, path + ".bak")
+    save(path)
+    print(f"[INFO] Saved updated model to {path} (previous version kept as .bak)")
+
+
+# ---------- XGBoost Tz ----------
+def align_xgboost_features(X: pd.DataFrame, feature_names) -> pd.DataFrame:
+    """Match the saved feature list (one-hot columns absent from new data become 0)."""
+    return X.reindex(columns=list(feature_names), fill_value=0)
+
+
+def update_xgboost(model_path, X_new, y_new, X_holdout, y_holdout, n_new_trees=50,
+                   features_path=None, X_reference=None, save=True, **report_kwargs):
+    """Append n_new_trees boosting rounds to the saved XGBRegressor, trained on the new data only."""
+    from xgboost import XGBRegressor
+
+    report_kwargs = _with_baseline(model_path, report_kwargs)
+    model = joblib.load(model_path)
+    if features_path is not None:
+        features = joblib.load(features_path)
+        X_new = align_xgboost_features(X_new, features)
+        X_holdout = align_xgboost_features(X_holdout, features)
+        if X_reference is not None:
+            X_reference = align_xgboost_features(X_reference, features)
+
+    before = regression_metrics(y_holdout, model.predict(X_holdout))
+    params = model.get_params()
+    params["n_estimators"] = n_new_trees
+    updated = XGBRegressor(**params)
+    print(f"[INFO] Boosting {n_new_trees} more trees on {len(X_new)} new rows...")
+    updated.fit(X_new, y_new, xgb_model=model.get_booster())
+    after = regression_metrics(y_holdout, updated.predict(X_holdout))
+
+    psi = population_stability(X_reference, X_new) if X_reference is not None else None
+    report = UpdateReport("XGBoost Tz", before, after, psi=psi, feature_names=getattr(X_new, "columns", None),
+                          **report_kwargs)
+    print(report.summary())
+    if report.accepted and save:
+        _backup_and_save(lambda p: joblib.dump(updated, p), model_path)
+    return (updated if report.accepted else model), report
+
+
+def update_xgboost_from_parquet(model_path, paths, holdout_fraction=0.2, qc_policy=None, juld_origin=None,
+                                X_reference=None, **kwargs):
+    """
+    Featurize new Argo Parquet files exactly as the Tz model is scored (ensemble.XGBoostTzModel.frame:
+    same one-hot names, juld from the training origin) and run update_xgboost on them.
+    The latest holdout_fraction of profiles (by time) is held out, so no profile is split.
+    """
+    from .ensemble import SharedFeatures, XGBoostTzModel
+    from .parallel import read_argo_parquet
+    from .profile_store import ProfileStore
+
+    adapter = XGBoostTzModel(model_path, juld_origin=juld_origin)
+    if adapter.juld_origin is None and adapter.feature_names and "juld" in adapter.feature_names:
+        raise ValueError(f"No training juld origin for {model_path}; pass juld_origin or retrain with XGBoost-2.py")
+    store = ProfileStore.concat(read_argo_parquet(p).filter_qc(qc_policy)[0] for p in paths)
+    features = SharedFeatures(store)
+    X = adapter.frame(features)
+    y = store.temperature
+    ok = ~np.isnan(y)
+
+    # Hold out whole profiles, latest first
+    times = np.asarray(store.meta.get("date_time", np.zeros(len(store), "datetime64[ns]")), dtype="datetime64[ns]")
+    n_holdout = max(1, int(round(len(store) * holdout_fraction)))
+    if len(store) < 2:
+        raise ValueError(f"Need at least 2 profiles to hold one out, got {len(store)}")
+    held = np.zeros(len(store), dtype=bool)
+    held[np.argsort(times, kind="stable")[-n_holdout:]] = True
+    held = held[store.profile_index()]
+    print(f"[INFO] Tz update data: {int((ok & ~held).sum())} new levels, {int((ok & held).sum())} held out")
+    return update_xgboost(model_path, X[ok & ~held], y[ok & ~held], X[ok & held], y[ok & held],
+                          X_reference=X_reference, **kwargs)
+
+
+# ---------- RandomForest max depth ----------
+def update_random_forest(model_path, X_new, y_new, X_holdout, y_holdout, n_new_trees=20, max_trees=400,
+                         X_reference=None, save=True, **report_kwargs):
+    """
+    Grow n_new_trees extra trees on the new data via warm_start; existing trees are kept as-is.
+    max_trees bounds prediction cost across repeated updates: past it the oldest trees are retired
+    (None → unbounded, every accepted update makes prediction slower).
+    """
+    report_kwargs = _with_baseline(model_path, report_kwargs)
+    model = joblib.load(model_path)
+    before = regression_metrics(y_holdout, model.predict(X_holdout))
+
+    old_trees = list(model.estimators_)
+    n_before = len(old_trees)
+    model.set_params(warm_start=True, n_estimators=n_before + n_new_trees)
+    print(f"[INFO] Adding {n_new_trees} trees to the forest ({n_before} → {n_before + n_new_trees})...")
+    model.fit(X_new, y_new)
+    if max_trees is not None and len(model.estimators_) > max_trees:
+        retired = len(model.estimators_) - max_trees
+        model.estimators_ = model.estimators_[retired:]
+        print(f"[INFO] Retired the {retired} oldest trees (max_trees={max_trees})")
+    # Saved models must not keep warm_start, and n_estimators has to match the trees actually held
+    model.set_params(warm_start=False, n_estimators=len(model.estimators_))
+    after = regression_metrics(y_holdout, model.predict(X_holdout))
+
+    psi = population_stability(X_reference, X_new) if X_reference is not None else None
+    report = UpdateReport("RandomForest max depth", before, after, psi=psi,
+                          feature_names=getattr(X_new, "columns", None), **report_kwargs)
+    print(report.summary())
+    if report.accepted:
+        if save:
+            _backup_and_save(lambda p: joblib.dump(model, p), model_path)
+    else:
+        # Back to the original trees
+        model.estimators_ = old_trees
+        model.set_params(n_estimators=n_before)
+    return model, report
+
+
+# ---------- LSTM MLD ----------
+def finetune_lstm(model_path, X_seq_new, y_seq_new, X_seq_holdout, y_seq_holdout, epochs=3,
+                  learning_rate=1e-4, batch_size=32, scaler_y=None, X_reference=None, X_current=None,
+                  save=True, **report_kwargs):
+    """
+    Fine-tune the saved LSTM for a few epochs on new (already scaled, windowed) sequences.
+    Metrics are reported in metres when scaler_y is given.
+    Drift is measured on the unwindowed rows (X_reference vs X_current) when provided.
+    """
+    from tensorflow import keras
+
+    report_kwargs = _with_baseline(model_path, report_kwargs)
+    model = keras.models.load_model(model_path)
+
+    def holdout_metrics(m):
+        pred = m.predict(X_seq_holdout, verbose=0)
+        truth = y_seq_holdout
+        if scaler_y is not None:
+            pred, truth = scaler_y.inverse_transform(pred), scaler_y.inverse_transform(truth)
+        return regression_metrics(truth, pred)
+
+    before = holdout_metrics(model)
+    weights = model.get_weights()
+    model.compile(optimizer=keras.optimizers.Adam(learning_rate), loss="mse", metrics=["mae", "mse"])
+    print(f"[INFO] Fine-tuning LSTM for {epochs} epochs on {len(X_seq_new)} new sequences...")
+    model.fit(X_seq_new, y_seq_new, epochs=epochs, batch_size=batch_size, verbose=1)
+    after = holdout_metrics(model)
+
+    psi = population_stability(X_reference, X_current) if X_reference is not None and X_current is not None else None
+    report = UpdateReport("LSTM MLD", before, after, psi=psi, **report_kwargs)
+    print(report.summary())
+    if report.accepted:
+        if save:
+            _backup_and_save(model.save, model_path)
+    else:
+        model.set_weights(weights)
+    return model, report
@@ -0,0 +1,152 @@
+"""
+Lazy NetCDF / Zarr reader for Argo profile archives
+- Opens each .nc file (or Zarr store) with dask-chunked xarray; nothing is loaded up front
+- Keeps only the level/profile variables the pipeline uses (n_calib/n_history data is never read)
+- Yields ProfileStore batches of N profiles straight into QC → features, with no Parquet copy
+"""
+
+import glob
+import os
+
+import numpy as np
+import xarray as xr
+
+from .argo import PROFILE_CATEGORIES, argo_datetime, clean_strings, resolve_argo_columns
+from .features import level_features
+from .parallel import combine_feature_tables, feature_stats
+from .profile_store import ProfileStore
+from .qc import QCPolicy, decode_qc_flags
+
+PROFILE_DIM = "n_prof"
+LEVEL_DIM = "n_levels"
+LEVEL_VARIABLES = [
+    "pres", "temp", "psal",
+    "pres_adjusted", "temp_adjusted", "psal_adjusted",
+    "pres_qc", "temp_qc", "psal_qc",
+    "pres_adjusted_qc", "temp_adjusted_qc", "psal_adjusted_qc",
+]
+PROFILE_VARIABLES = [
+    "latitude", "longitude", "juld", "platform_number", "cycle_number", *PROFILE_CATEGORIES,
+]
+
+
+# ---------- Opening ----------
+def _is_zarr(path: str) -> bool:
+    return path.rstrip("/\\").endswith(".zarr") or (
+        os.path.isdir(path) and any(os.path.exists(os.path.join(path, m)) for m in (".zgroup", "zarr.json"))
+    )
+
+
+def expand_sources(source) -> list:
+    """A directory (→ its *.nc / *.zarr), a glob pattern, a single path, or a list of paths."""
+    if isinstance(source, (list, tuple)):
+        return list(source)
+    if os.path.isdir(source) and not _is_zarr(source):
+        found = glob.glob(os.path.join(source, "*.nc")) + glob.glob(os.path.join(source, "*.zarr"))
+        return sorted(found)
+    return sorted(glob.glob(source)) or [source]
+
+
+def _select_variables(ds: xr.Dataset) -> xr.Dataset:
+    # GDAC files use upper-case names (PRES, N_PROF); the NODC copies are lower-case
+    ds = ds.rename_dims({d: d.lower() for d in ds.dims if d != d.lower()})
+    ds = ds.rename_vars({v: v.lower() for v in ds.variables if v != v.lower()})
+    keep = [v for v in LEVEL_VARIABLES + PROFILE_VARIABLES if v in ds.variables]
+    return ds[keep]
+
+
+def open_argo(path: str, profiles_per_chunk: int = 1024) -> xr.Dataset:
+    """Lazily open one Argo NetCDF file or Zarr store, chunked along profiles."""
+    if _is_zarr(path):
+        ds = xr.open_zarr(path)
+    else:
+        ds = xr.open_dataset(path, chunks={})
+    ds = _select_variables(ds)
+    return ds.chunk({PROFILE_DIM: profiles_per_chunk})
+
+
+# ---------- Batch → ProfileStore ----------
+def dataset_to_store(ds: xr.Dataset, profile_base: int = 0) -> ProfileStore:
+    """
+    Load one (small) profile slice and pack it into a ProfileStore.
+    Fill levels (pressure NaN after CF decoding) are dropped; levels are depth-sorted per profile.
+    """
+    ds = ds.load()
+    cols = resolve_argo_columns(ds.variables)
+    pres = ds[cols["depth"]].transpose(PROFILE_DIM, LEVEL_DIM).values.astype(np.float32)
+    valid = np.isfinite(pres)
+
+    # Sort each row by pressure with fill levels last, then keep the valid prefix of every row
+    idx = np.argsort(np.where(valid, pres, np.inf), axis=1, kind="stable")
+    valid = np.take_along_axis(valid, idx, axis=1)
+    lengths = valid.sum(axis=1)
+    offsets = np.r_[0, np.cumsum(lengths)].astype(np.int64)
+
+    def levels(var):
+        values = ds[var].transpose(PROFILE_DIM, LEVEL_DIM).values
+        return np.take_along_axis(values, idx, axis=1)[valid]
+
+    depth = levels(cols["depth"]).astype(np.float32)
+    temperature = levels(cols["temperature"]).astype(np.float32)
+    salinity = levels(cols["salinity"]).astype(np.float32)
+    qc = {f"{name}_qc": decode_qc_flags(levels(f"{col}_qc"))
+          for name, col in cols.items() if f"{col}_qc" in ds.variables}
+
+    n_prof = pres.shape[0]
+    meta = {"profile_id": np.arange(profile_base, profile_base + n_prof, dtype=np.int64)}
+    if "platform_number" in ds.variables:
+        meta["platform_number"] = clean_strings(ds["platform_number"].values)
+    if "cycle_number" in ds.variables:
+        cycle = ds["cycle_number"].values.astype(np.float64)
+        meta["cycle_number"] = np.where(np.isfinite(cycle), cycle, -1).astype(np.int32)
+    meta["latitude"] = ds["latitude"].values.astype(np.float64)
+    meta["longitude"] = ds["longitude"].values.astype(np.float64)
+    if "juld" in ds.variables:
+        times = argo_datetime(ds["juld"].values)
+        meta["date_time"] = times.dt.tz_localize(None).to_numpy(dtype="datetime64[ns]")
+    for col in PROFILE_CATEGORIES:
+        if col in ds.variables:
+            meta[col] = clean_strings(ds[col].values)
+
+    return ProfileStore(offsets, depth, temperature, salinity, qc=qc, meta=meta)
+
+
+# ---------- Reader ----------
+class ArgoArchiveReader:
+    """
+    Iterate ProfileStore batches over one or many NetCDF files / Zarr stores.
+    Only one batch of `profiles_per_batch` profiles is in memory at a time.
+    """
+
+    def __init__(self, source, profiles_per_batch: int = 1024):
+        self.paths = expand_sources(source)
+        if not self.paths:
+            raise ValueError(f"No NetCDF/Zarr files found in {source}")
+        self.profiles_per_batch = profiles_per_batch
+
+    def __iter__(self):
+        profile_base = 0
+        for path in self.paths:
+            try:
+                ds = open_argo(path, self.profiles_per_batch)
+            except Exception as e:
+                print(f"[WARNING] Could not open {path}: {e}")
+                continue
+            n_prof = ds.sizes[PROFILE_DIM]
+            print(f"[INFO] Streaming {os.path.basename(path.rstrip('/'))}: {n_prof} profiles")
+            for start in range(0, n_prof, self.profiles_per_batch):
+                stop = min(start + self.profiles_per_batch, n_prof)
+                yield dataset_to_store(ds.isel({PROFILE_DIM: slice(start, stop)}), profile_base + start)
+            profile_base += n_prof
+            ds.close()
+
+    def feature_tables(self, qc_policy: QCPolicy = None, threshold: float = 0.5, ref_depth: float = 10.0):
+        """Yield (features table, stats, n_profiles) per batch, ready for combine_feature_tables."""
+        for store in self:
+            store, _ = store.filter_qc(qc_policy)
+            table = level_features(store, threshold, ref_depth)
+            yield table, feature_stats(table), len(store)
+
+    def features(self, qc_policy: QCPolicy = None, threshold: float = 0.5, ref_depth: float = 10.0):
+        """Model-ready FeatureSet straight from the archive (same columns/order as the Parquet path)."""
+        return combine_feature_tables(self.feature_tables(qc_policy, threshold, ref_depth))
@@ -0,0 +1,191 @@
+"""
+Multi-core feature preparation
+- Map: one task per Parquet file (read only the needed columns → ProfileStore → QC → MLD → features)
+- Parquet is read straight into the store from Arrow buffers (no pandas frame per file)
+- Workers hand results back as Arrow IPC streams, not pickled DataFrames; the serial path
+  passes the Arrow table through without serializing
+- Reduce: concatenate, renumber profile IDs globally, order by time, fit scalers from per-file min/max
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sklearn.preprocessing import MinMaxScaler
+
+from .argo import ARGO_VARIABLES, PROFILE_CATEGORIES, resolve_argo_columns
+from .features import FEATURE_COLUMNS, TARGET_COLUMN, level_features
+from .profile_store import ProfileStore
+from .qc import QCPolicy
+
+# Columns a worker needs from a raw Argo Parquet file (anything else is never read)
+ARGO_READ_COLUMNS = [
+    "pres", "temp", "psal",
+    "pres_adjusted", "temp_adjusted", "psal_adjusted",
+    "pres_qc", "temp_qc", "psal_qc",
+    "pres_adjusted_qc", "temp_adjusted_qc", "psal_adjusted_qc",
+    *PROFILE_CATEGORIES,
+    "latitude", "longitude", "juld", "date_time",
+    "platform_number", "cycle_number", "profile_id",
+    "n_prof", "n_levels",
+]
+
+
+# ---------- Map (runs in worker processes) ----------
+def read_argo_parquet(path: str, columns=ARGO_READ_COLUMNS) -> ProfileStore:
+    """
+    Read only the Argo columns the pipeline uses from one Parquet file. Of pres/pres_adjusted
+    (etc.) only the variant resolve_argo_columns picks is read, together with its QC flags.
+    """
+    present = set(pq.read_schema(path).names)
+    chosen = set(resolve_argo_columns(present).values())
+    skipped = {c for var in ARGO_VARIABLES.values() for c in (var, f"{var}_adjusted")} - chosen
+    table = pq.read_table(path, columns=[c for c in columns if c in present
+                                         and c not in skipped and c.removesuffix("_qc") not in skipped])
+    store = ProfileStore.from_argo_table(table)
+    del table
+    # Freed Arrow buffers stay in Arrow's allocator; hand them back so the NumPy stages reuse the pages
+    pa.default_memory_pool().release_unused()
+    return store
+
+
+def _serialize(table: pa.Table) -> bytes:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _deserialize(payload: bytes) -> pa.Table:
+    return pa.ipc.open_stream(pa.py_buffer(payload)).read_all()
+
+
+def _prepare_file(path: str, qc_policy: QCPolicy, threshold: float, ref_depth: float, serialize: bool = True):
+    """Worker task: returns (path, Arrow IPC payload or table, per-file column min/max, profile count)."""
+    store, qc = read_argo_parquet(path).filter_qc(qc_policy)
+    table = level_features(store, threshold, ref_depth)
+    payload = _serialize(table) if serialize else table
+    return path, payload, feature_stats(table), len(store), qc.summary(os.path.basename(path))
+
+
+# ---------- Reduce ----------
+class FeatureSet:
+    """Output of the global reduce: float32 model inputs plus the fitted scalers."""
+
+    def __init__(self, X, y, profile_id, date_time, scaler_X, scaler_y):
+        self.X = X
+        self.y = y
+        self.profile_id = profile_id
+        self.date_time = date_time
+        self.scaler_X = scaler_X
+        self.scaler_y = scaler_y
+
+    def __repr__(self) -> str:
+        return f"FeatureSet(X={self.X.shape}, y={self.y.shape}, profiles={np.unique(self.profile_id).size})"
+
+
+def minmax_inplace(scaler: MinMaxScaler, X: np.ndarray) -> np.ndarray:
+    """scaler.transform(X) written into X (float32 stays float32, no second feature matrix)."""
+    X *= scaler.scale_.astype(X.dtype)
+    X += scaler.min_.astype(X.dtype)
+    return X
+
+
+def feature_stats(table: pa.Table):
+    """Per-column (min, max) over FEATURE_COLUMNS + target, or None for an empty table."""
+    if not table.num_rows:
+        return None
+    cols = [table.column(c).to_numpy() for c in FEATURE_COLUMNS + [TARGET_COLUMN]]
+    return np.array([np.nanmin(c) for c in cols]), np.array([np.nanmax(c) for c in cols])
+
+
+def combine_feature_tables(parts) -> FeatureSet:
+    """
+    Global reduce over (features table, stats, n_profiles) parts, in order.
+    Profile IDs become global, rows are ordered by date_time and scalers are fitted from the stats.
+    """
+    tables, mins, maxs = [], [], []
+    profile_base = 0
+    for table, stats, n_prof in parts:
+        # Per-part profile IDs are made positional (0..n_prof-1) and offset to be global
+        if table.num_rows:
+            local = table.column("profile_id").to_numpy()
+            _, local_pos = np.unique(local, return_inverse=True)
+            table = table.set_column(
+                table.schema.get_field_index("profile_id"), "profile_id",
+                pa.array(local_pos.astype(np.int64) + profile_base),
+            )
+            tables.append(table)
+            stats = stats if stats is not None else feature_stats(table)
+            mins.append(stats[0]); maxs.append(stats[1])
+        profile_base += n_prof
+
+    if not tables:
+        raise ValueError("No valid rows after QC/feature preparation")
+
+    # One materialization: each column is gathered straight into its final (time-ordered) slot
+    combined = pa.concat_tables(tables)
+    time_ns = combined.column("date_time").to_numpy()
+    order = np.argsort(time_ns, kind="stable")
+    X = np.empty((combined.num_rows, len(FEATURE_COLUMNS)), dtype=np.float32)
+    for j, c in enumerate(FEATURE_COLUMNS):
+        X[:, j] = combined.column(c).to_numpy()[order]
+    y = combined.column(TARGET_COLUMN).to_numpy()[order].astype(np.float32).reshape(-1, 1)
+    profile_id = combined.column("profile_id").to_numpy()[order]
+
+    # Global min/max from per-part stats: fitting on the two extreme rows gives identical scalers
+    lo, hi = np.nanmin(np.vstack(mins), axis=0), np.nanmax(np.vstack(maxs), axis=0)
+    scaler_X = MinMaxScaler().fit(np.vstack([lo[:-1], hi[:-1]]))
+    scaler_y = MinMaxScaler().fit(np.vstack([lo[-1:], hi[-1:]]))
+
+    print(f"[INFO] Final dataset: X={X.shape}, y={y.shape}, profiles={profile_base}")
+    return FeatureSet(X, y, profile_id, time_ns[order], scaler_X, scaler_y)
+
+
+class ParallelFeatureExecutor:
+    """
+    Per-file map / global reduce feature preparation over a process pool.
+
+    Produces the feature columns of MLDPredictor.prepare_features (NODC level copies collapsed
+    as in ProfileStore), ordered by date_time, then profile and depth.
+    """
+
+    def __init__(self, n_workers: int = None, qc_policy: QCPolicy = None,
+                 mld_threshold: float = 0.5, ref_depth: float = 10.0, mp_context=None):
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.qc_policy = qc_policy or QCPolicy()
+        self.mld_threshold = mld_threshold
+        self.ref_depth = ref_depth
+        self.mp_context = mp_context
+
+    def map(self, paths):
+        """Yield (path, features table, stats, n_profiles) in input order."""
+        paths = list(paths)
+        args = (self.qc_policy, self.mld_threshold, self.ref_depth)
+        if self.n_workers == 1 or len(paths) == 1:
+            results = (_prepare_file(p, *args, serialize=False) for p in paths)
+            for path, table, stats, n_prof, qc_summary in results:
+                print(qc_summary)
+                yield path, table, stats, n_prof
+            return
+
+        workers = min(self.n_workers, len(paths))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=self.mp_context) as pool:
+            futures = [pool.submit(_prepare_file, p, *args) for p in paths]
+            for fut in futures:
+                try:
+                    path, payload, stats, n_prof, qc_summary = fut.result()
+                except Exception as e:
+                    print(f"[WARNING] Feature preparation failed: {e}")
+                    continue
+                print(qc_summary)
+                yield path, _deserialize(payload), stats, n_prof
+
+    def run(self, paths) -> FeatureSet:
+        paths = list(paths)
+        if not paths:
+            raise ValueError("No input files given")
+        print(f"[INFO] Preparing features for {len(paths)} files on {min(self.n_workers, len(paths))} workers...")
+        return combine_feature_tables((table, stats, n_prof) for _, table, stats, n_prof in self.map(paths))
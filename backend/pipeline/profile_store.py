@@ -0,0 +1,373 @@
+"""
+Compact columnar store for Argo profiles
+- Measurements (depth/temperature/salinity) as contiguous float32 arrays
+- Per-profile offsets into those arrays (profile i = rows offsets[i]:offsets[i+1])
+- One row per level: NODC files repeat every level across n_param × n_calib × n_history,
+  those copies are collapsed on (profile, n_prof, n_levels)
+- Per-level QC flags decoded once into uint8 codes
+- Profile metadata (platform, cycle, lat, lon, time, categorical flags) stored once per profile
+- Cheap NumPy / Arrow / DataFrame views
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pandas.api.types import union_categoricals
+
+from .argo import MEASUREMENTS, PROFILE_CATEGORIES, argo_datetime, clean_strings, resolve_argo_columns
+from .qc import apply_qc, decode_qc_flags
+
+
+# ---------- Construction helpers ----------
+def _arrow_numpy(column, dtype=None) -> np.ndarray:
+    """Arrow column → NumPy; a view of the Arrow buffer for single-chunk, null-free numeric columns."""
+    if isinstance(column, pa.ChunkedArray) and column.num_chunks == 1:
+        column = column.chunk(0)
+    if column.null_count and pa.types.is_floating(column.type):
+        column = column.fill_null(float("nan"))
+    values = column.to_numpy(zero_copy_only=False)
+    if dtype is not None and values.dtype != dtype:
+        if values.dtype == object:
+            values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy()
+        values = values.astype(dtype)
+    return values
+
+
+def _level_ids(n_prof, n_levels) -> np.ndarray:
+    """(n_prof, n_levels) dimension indices → one int64 level id per row (missing → -1)."""
+    level = pd.to_numeric(pd.Series(n_levels), errors="coerce").fillna(-1).to_numpy(np.int64)
+    if n_prof is None:
+        return level
+    prof = pd.to_numeric(pd.Series(n_prof), errors="coerce").fillna(-1).to_numpy(np.int64)
+    return (prof + 1) * (int(level.max(initial=0)) + 2) + (level + 1)
+
+
+def _segments(key: np.ndarray, depth: np.ndarray, level_id: np.ndarray = None):
+    """
+    Sort by (profile key, depth) → (order, segment starts, offsets) so every profile is contiguous.
+    With level_id, only the first row of each (profile, level) is kept, which drops the
+    cross-product copies of each level in NODC-converted files.
+    """
+    if level_id is None:
+        rows = None
+    else:
+        by_level = np.lexsort((level_id, key))
+        k, l = key[by_level], level_id[by_level]
+        first = np.r_[True, (k[1:] != k[:-1]) | (l[1:] != l[:-1])] if k.size else np.empty(0, bool)
+        rows = np.sort(by_level[first])
+        key, depth = key[rows], depth[rows]
+    order = np.lexsort((depth, key))
+    key_sorted = key[order]
+    starts = np.flatnonzero(np.r_[True, key_sorted[1:] != key_sorted[:-1]]) if order.size else np.empty(0, np.int64)
+    offsets = np.r_[starts, order.size].astype(np.int64)
+    if rows is not None:
+        order = rows[order]
+    return order, starts, offsets
+
+
+def _profile_meta(profile_keys, first_rows, columns, take) -> dict:
+    """
+    Per-profile metadata from each profile's first source row.
+    take(column, rows) returns the column's values at those rows as a NumPy array.
+    """
+    columns = set(columns)
+    meta = {"profile_id": np.asarray(profile_keys, dtype=np.int64)}
+    if "platform_number" in columns:
+        meta["platform_number"] = clean_strings(take("platform_number", first_rows))
+    if "cycle_number" in columns:
+        cycle = pd.to_numeric(pd.Series(take("cycle_number", first_rows)), errors="coerce")
+        meta["cycle_number"] = cycle.fillna(-1).to_numpy(dtype=np.int32)
+    meta["latitude"] = pd.to_numeric(pd.Series(take("latitude", first_rows)), errors="coerce").to_numpy(np.float64)
+    meta["longitude"] = pd.to_numeric(pd.Series(take("longitude", first_rows)), errors="coerce").to_numpy(np.float64)
+    time_col = "date_time" if "date_time" in columns else ("juld" if "juld" in columns else None)
+    if time_col is not None:
+        # Convert once per profile rather than once per level; stored as naive UTC datetime64[ns]
+        times = argo_datetime(take(time_col, first_rows))
+        meta["date_time"] = times.dt.tz_localize(None).to_numpy(dtype="datetime64[ns]")
+    for col in PROFILE_CATEGORIES:
+        if col in columns:
+            meta[col] = clean_strings(take(col, first_rows))
+    return meta
+
+
+# ---------- Store ----------
+class ProfileStore:
+    """
+    Segmented (CSR-style) profile store.
+
+    Level arrays have one entry per measurement level, ordered by profile then depth.
+    Profile arrays have one entry per profile.
+    """
+
+    def __init__(self, offsets, depth, temperature, salinity, qc=None, meta=None):
+        self.offsets = np.ascontiguousarray(offsets, dtype=np.int64)
+        self.depth = np.ascontiguousarray(depth, dtype=np.float32)
+        self.temperature = np.ascontiguousarray(temperature, dtype=np.float32)
+        self.salinity = np.ascontiguousarray(salinity, dtype=np.float32)
+        # e.g. {"depth_qc": uint8[n_levels], ...}; only flags present in the source are kept
+        self.qc = {k: np.ascontiguousarray(v, dtype=np.uint8) for k, v in (qc or {}).items()}
+        # e.g. {"profile_id": int64, "platform_number": Categorical, "latitude": float64, ...}
+        self.meta = dict(meta or {})
+
+        n_levels = self.offsets[-1] if self.offsets.size else 0
+        for name in MEASUREMENTS:
+            if getattr(self, name).shape != (n_levels,):
+                raise ValueError(f"{name} has {getattr(self, name).size} levels, offsets expect {n_levels}")
+        if "profile_id" not in self.meta:
+            self.meta["profile_id"] = np.arange(len(self), dtype=np.int64)
+
+    # ---------- Construction ----------
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "ProfileStore":
+        """
+        Build a store from a raw Argo frame (pres/temp/psal[_adjusted] + metadata)
+        or from the output of normalize_argo_columns (depth/temperature/salinity).
+        """
+        cols = resolve_argo_columns(df.columns)
+        if "latitude" not in df.columns or "longitude" not in df.columns:
+            raise ValueError("latitude/longitude columns required")
+
+        # Profile key → sort by (profile, depth) so every profile is one contiguous segment
+        if "profile_id" in df.columns:
+            key = df["profile_id"].to_numpy()
+        elif "platform_number" in df.columns and "cycle_number" in df.columns:
+            key = df.groupby(["platform_number", "cycle_number"], sort=False, dropna=False).ngroup().to_numpy()
+        else:
+            time_col = "date_time" if "date_time" in df.columns else "juld"
+            by = ["latitude", "longitude"] + ([time_col] if time_col in df.columns else [])
+            key = df.groupby(by, sort=False, dropna=False).ngroup().to_numpy()
+
+        depth = pd.to_numeric(df[cols["depth"]], errors="coerce").to_numpy(dtype=np.float32)
+        level_id = None
+        if "n_levels" in df.columns:
+            level_id = _level_ids(df["n_prof"].to_numpy() if "n_prof" in df.columns else None,
+                                  df["n_levels"].to_numpy())
+        order, starts, offsets = _segments(key, depth, level_id)
+
+        levels = {"depth": depth[order]}
+        for name in ("temperature", "salinity"):
+            levels[name] = pd.to_numeric(df[cols[name]], errors="coerce").to_numpy(dtype=np.float32)[order]
+
+        qc = {}
+        for name, col in cols.items():
+            if f"{col}_qc" in df.columns:
+                qc[f"{name}_qc"] = decode_qc_flags(df[f"{col}_qc"])[order]
+
+        meta = _profile_meta(key[order][starts], order[starts], df.columns, lambda c, rows: df[c].to_numpy()[rows])
+        return cls(offsets, levels["depth"], levels["temperature"], levels["salinity"], qc=qc, meta=meta)
+
+    @classmethod
+    def from_argo_table(cls, table: pa.Table) -> "ProfileStore":
+        """
+        Same as from_frame for a raw Argo Arrow table, without going through pandas:
+        float32 level columns are read as views of the Arrow buffers, QC flags are decoded from
+        the binary buffers, and string metadata is only converted for one row per profile.
+        """
+        names = table.column_names
+        cols = resolve_argo_columns(names)
+        if "latitude" not in names or "longitude" not in names:
+            raise ValueError("latitude/longitude columns required")
+
+        if "profile_id" in names:
+            key = _arrow_numpy(table.column("profile_id"))
+        elif "platform_number" in names and "cycle_number" in names:
+            # First-appearance codes, as groupby(sort=False).ngroup() gives in from_frame
+            platform = table.column("platform_number").dictionary_encode().combine_chunks().indices
+            platform = platform.fill_null(-1).to_numpy().astype(np.int64)
+            cycle = pd.factorize(_arrow_numpy(table.column("cycle_number")), use_na_sentinel=False)[0]
+            key = pd.factorize(platform * (int(cycle.max(initial=0)) + 1) + cycle)[0]
+        else:
+            time_col = "date_time" if "date_time" in names else "juld"
+            by = ["latitude", "longitude"] + ([time_col] if time_col in names else [])
+            frame = pd.DataFrame({c: _arrow_numpy(table.column(c)) for c in by})
+            key = frame.groupby(by, sort=False, dropna=False).ngroup().to_numpy()
+
+        depth = _arrow_numpy(table.column(cols["depth"]), np.float32)
+        level_id = None
+        if "n_levels" in names:
+            level_id = _level_ids(_arrow_numpy(table.column("n_prof")) if "n_prof" in names else None,
+                                  _arrow_numpy(table.column("n_levels")))
+        order, starts, offsets = _segments(key, depth, level_id)
+
+        levels = {"depth": depth[order]}
+        for name in ("temperature", "salinity"):
+            levels[name] = _arrow_numpy(table.column(cols[name]), np.float32)[order]
+
+        qc = {}
+        for name, col in cols.items():
+            if f"{col}_qc" in names:
+                qc[f"{name}_qc"] = decode_qc_flags(table.column(f"{col}_qc"))[order]
+
+        take = lambda c, rows: table.column(c).take(pa.array(rows)).to_numpy(zero_copy_only=False)
+        meta = _profile_meta(key[order][starts], order[starts], names, take)
+        return cls(offsets, levels["depth"], levels["temperature"], levels["salinity"], qc=qc, meta=meta)
+
+    @classmethod
+    def from_arrow(cls, table: pa.Table) -> "ProfileStore":
+        """Inverse of to_arrow(): one row per profile, list columns for the levels."""
+        table = table.combine_chunks()
+        depth_list = table.column("depth").chunk(0) if table.num_rows else None
+        if depth_list is None:
+            return cls(np.zeros(1, np.int64), [], [], [])
+        offsets = depth_list.offsets.to_numpy()
+        base = offsets[0]
+        offsets = offsets - base
+
+        def values(name, dtype):
+            arr = table.column(name).chunk(0)
+            return arr.values.to_numpy(zero_copy_only=False)[base:base + offsets[-1]].astype(dtype, copy=False)
+
+        levels = {name: values(name, np.float32) for name in MEASUREMENTS}
+        qc = {name: values(name, np.uint8) for name in table.column_names if name.endswith("_qc") and name[:-3] in MEASUREMENTS}
+        meta = {}
+        for name in table.column_names:
+            if name in levels or name in qc:
+                continue
+            col = table.column(name)
+            if pa.types.is_dictionary(col.type):
+                meta[name] = col.to_pandas().array
+            elif pa.types.is_timestamp(col.type):
+                meta[name] = col.cast(pa.timestamp("ns")).to_numpy()
+            else:
+                meta[name] = col.to_numpy()
+        return cls(offsets, levels["depth"], levels["temperature"], levels["salinity"], qc=qc, meta=meta)
+
+    @classmethod
+    def concat(cls, stores) -> "ProfileStore":
+        """Stack stores (e.g. one per file); profile_id is renumbered 0..n-1 since per-file IDs collide."""
+        stores = [s for s in stores if len(s)]
+        if not stores:
+            return cls(np.zeros(1, np.int64), [], [], [])
+        lengths = np.concatenate([s.lengths for s in stores])
+        offsets = np.r_[0, np.cumsum(lengths)].astype(np.int64)
+        levels = {name: np.concatenate([getattr(s, name) for s in stores]) for name in MEASUREMENTS}
+        qc_names = set.intersection(*(set(s.qc) for s in stores))
+        qc = {name: np.concatenate([s.qc[name] for s in stores]) for name in qc_names}
+        meta = {}
+        for name in set.intersection(*(set(s.meta) for s in stores)) - {"profile_id"}:
+            parts = [s.meta[name] for s in stores]
+            if isinstance(parts[0], pd.Categorical):
+                meta[name] = union_categoricals(parts)
+            else:
+                meta[name] = np.concatenate(parts)
+        meta["profile_id"] = np.arange(lengths.size, dtype=np.int64)
+        return cls(offsets, levels["depth"], levels["temperature"], levels["salinity"], qc=qc, meta=meta)
+
+    # ---------- Shape ----------
+    def __len__(self) -> int:
+        return max(self.offsets.size - 1, 0)
+
+    @property
+    def n_levels(self) -> int:
+        return int(self.offsets[-1]) if self.offsets.size else 0
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    @property
+    def nbytes(self) -> int:
+        total = self.offsets.nbytes + sum(getattr(self, n).nbytes for n in MEASUREMENTS)
+        total += sum(v.nbytes for v in self.qc.values())
+        for v in self.meta.values():
+            total += v.nbytes if hasattr(v, "nbytes") else np.asarray(v).nbytes
+        return int(total)
+
+    def profile_index(self) -> np.ndarray:
+        """Profile position (0..len-1) of every level."""
+        return np.repeat(np.arange(len(self), dtype=np.int64), self.lengths)
+
+    def profile(self, i: int) -> dict:
+        """Views (no copies) onto one profile's levels."""
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        out = {name: getattr(self, name)[lo:hi] for name in MEASUREMENTS}
+        out.update({name: v[lo:hi] for name, v in self.qc.items()})
+        return out
+
+    # ---------- Vectorized per-profile ops ----------
+    def reduce(self, name: str, ufunc=np.fmax) -> np.ndarray:
+        """Per-profile reduction of a level array, e.g. store.reduce("depth", np.fmax) → max depth."""
+        values = getattr(self, name) if name in MEASUREMENTS else self.qc[name]
+        out = np.full(len(self), np.nan, dtype=np.float32) if values.dtype.kind == "f" else np.zeros(len(self), values.dtype)
+        nonempty = self.lengths > 0
+        if nonempty.any():
+            out[nonempty] = ufunc.reduceat(values, self.offsets[:-1][nonempty])
+        return out
+
+    def padded(self, name: str, fill=np.nan) -> np.ndarray:
+        """(n_profiles, max_levels) matrix of a level array, right-padded with `fill`."""
+        values = getattr(self, name) if name in MEASUREMENTS else self.qc[name]
+        lengths = self.lengths
+        width = int(lengths.max()) if lengths.size else 0
+        out = np.full((len(self), width), fill, dtype=values.dtype)
+        col = np.arange(self.n_levels, dtype=np.int64) - np.repeat(self.offsets[:-1], lengths)
+        out[self.profile_index(), col] = values
+        return out
+
+    def select_levels(self, mask: np.ndarray, drop_empty: bool = True) -> "ProfileStore":
+        """Keep levels where mask is True; profiles left with no levels are dropped unless drop_empty=False."""
+        mask = np.asarray(mask, dtype=bool)
+        csum = np.r_[0, np.cumsum(mask, dtype=np.int64)]
+        counts = csum[self.offsets[1:]] - csum[self.offsets[:-1]]
+        keep = counts > 0 if drop_empty else np.ones(len(self), dtype=bool)
+        offsets = np.r_[0, np.cumsum(counts[keep])].astype(np.int64)
+        meta = {k: v[keep] for k, v in self.meta.items()}
+        return ProfileStore(
+            offsets,
+            self.depth[mask], self.temperature[mask], self.salinity[mask],
+            qc={k: v[mask] for k, v in self.qc.items()},
+            meta=meta,
+        )
+
+    def filter_qc(self, policy=None):
+        """Drop levels rejected by a QCPolicy; returns (filtered store, QCResult)."""
+        result = apply_qc(self, policy)
+        return self.select_levels(result.mask), result
+
+    # ---------- Views ----------
+    def to_numpy(self, columns=MEASUREMENTS) -> np.ndarray:
+        """(n_levels, len(columns)) float32 matrix of level arrays."""
+        return np.column_stack([getattr(self, c) for c in columns])
+
+    def profiles_frame(self) -> pd.DataFrame:
+        """One row per profile: metadata plus level count."""
+        prof = pd.DataFrame({k: v for k, v in self.meta.items()})
+        if "date_time" in prof.columns:
+            prof["date_time"] = pd.to_datetime(prof["date_time"]).dt.tz_localize("UTC")
+        prof["n_levels"] = self.lengths
+        return prof
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Long (one row per level) frame with the column names produced by normalize_argo_columns.
+        Metadata is broadcast from the per-profile arrays; categoricals stay categorical.
+        """
+        prof = self.profiles_frame().drop(columns="n_levels")
+        out = prof.iloc[self.profile_index()].reset_index(drop=True)
+        for name in MEASUREMENTS:
+            out[name] = getattr(self, name)
+        for name, v in self.qc.items():
+            out[name] = v
+        return out
+
+    def to_arrow(self) -> pa.Table:
+        """One row per profile, levels as large_list columns sharing the store's buffers."""
+        arrays, names = [], []
+        for name, v in self.meta.items():
+            if isinstance(v, pd.Categorical):
+                arrays.append(pa.array(v))
+            elif np.asarray(v).dtype.kind == "M":
+                arrays.append(pa.array(v).cast(pa.timestamp("ns", tz="UTC")))
+            else:
+                arrays.append(pa.array(v))
+            names.append(name)
+        for name in MEASUREMENTS:
+            arrays.append(pa.LargeListArray.from_arrays(self.offsets, pa.array(getattr(self, name))))
+            names.append(name)
+        for name, v in self.qc.items():
+            arrays.append(pa.LargeListArray.from_arrays(self.offsets, pa.array(v)))
+            names.append(name)
+        return pa.Table.from_arrays(arrays, names=names)
+
+    def __repr__(self) -> str:
+        return f"ProfileStore(profiles={len(self)}, levels={self.n_levels}, {self.nbytes / 1e6:.1f} MB)"
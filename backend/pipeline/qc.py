@@ -0,0 +1,221 @@
+"""
+Vectorized Argo QC filtering
+- Decodes QC flag columns once into uint8 codes (no per-row Python strings)
+- Level rules: <var>_qc flags per measurement (default keep '1' good / '2' probably good)
+- Profile rules: profile_<var>_qc grades 'A'-'F' (fraction of good levels in the profile)
+- Combines rules through a configurable QCPolicy into one boolean mask with NumPy ops
+- Reports per-rule rejection counts
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .argo import ARGO_VARIABLES, MEASUREMENTS, resolve_argo_columns
+
+QC_MISSING = np.uint8(255)
+
+
+# ---------- Decoding ----------
+def _arrow_first_bytes(values):
+    """
+    First byte of every binary/string value straight from the Arrow offset and data buffers
+    (0 for empty or null), or None for non-string columns. No per-row Python objects.
+    """
+    if pa.types.is_dictionary(values.type):
+        values = values.cast(values.type.value_type)
+    if pa.types.is_string(values.type) or pa.types.is_large_string(values.type):
+        values = values.cast(pa.large_binary() if pa.types.is_large_string(values.type) else pa.binary())
+    if not (pa.types.is_binary(values.type) or pa.types.is_large_binary(values.type)):
+        return None
+    offset_type = np.int64 if pa.types.is_large_binary(values.type) else np.int32
+    chunks = values.chunks if isinstance(values, pa.ChunkedArray) else [values]
+    out = []
+    for chunk in chunks:
+        _, offsets, data = chunk.buffers()
+        off = np.frombuffer(offsets, dtype=offset_type)[chunk.offset:chunk.offset + len(chunk) + 1]
+        first = np.zeros(len(chunk), dtype=np.int16)   # a byte needs no int64; keeps big columns small
+        nonempty = off[1:] > off[:-1]
+        if data is not None and nonempty.any():
+            first[nonempty] = np.frombuffer(data, dtype=np.uint8)[off[:-1][nonempty]]
+        if chunk.null_count:
+            first[chunk.is_null().to_numpy(zero_copy_only=False)] = 0
+        out.append(first)
+    return np.concatenate(out) if out else np.empty(0, dtype=np.int16)
+
+
+def _first_code_points(values):
+    """
+    First character of every flag as a code point (0 for empty), or None for numeric input.
+    Categoricals are handled by the callers, which decode only their categories.
+    """
+    if isinstance(values, (pa.Array, pa.ChunkedArray)):
+        return _arrow_first_bytes(values)
+    arr = np.asarray(values)
+    if arr.dtype.kind in "biuf":
+        return None
+    if arr.dtype.kind == "U":
+        return arr.astype("U1").view(np.uint32).astype(np.int64)
+    try:
+        return arr.astype("S1").view(np.uint8).astype(np.int64)
+    except UnicodeEncodeError:
+        return arr.astype("U1").view(np.uint32).astype(np.int64)
+
+
+def _categorical_lut(values, decode):
+    # Decode the (few) categories, then gather by code; code -1 hits the trailing QC_MISSING
+    lut = np.append(decode(np.asarray(values.categories)), QC_MISSING)
+    return lut[values.codes]
+
+
+def decode_qc_flags(values) -> np.ndarray:
+    """
+    Decode Argo QC flags (bytes, str, numbers, categoricals or Arrow arrays) into uint8 codes 0-9.
+    Anything that is not a single-digit flag (blank, NaN, None) becomes QC_MISSING.
+    """
+    if isinstance(values, pd.Series):
+        values = values.array
+    if isinstance(values, pd.Categorical):
+        return _categorical_lut(values, decode_qc_flags)
+
+    raw = _first_code_points(values)
+    if raw is None:
+        f = np.asarray(values, dtype=np.float64)
+        ok = np.isfinite(f) & (f >= 0) & (f <= 9) & (f == np.floor(f))
+        out = np.full(f.shape, QC_MISSING, dtype=np.uint8)
+        out[ok] = f[ok].astype(np.uint8)
+        return out
+    digit = raw - ord("0")
+    ok = (digit >= 0) & (digit <= 9)
+    return np.where(ok, digit, QC_MISSING).astype(np.uint8)
+
+
+def decode_profile_grades(values) -> np.ndarray:
+    """
+    Decode profile_<var>_qc grades into uint8 ASCII codes ('A' → 65 ... 'F' → 70).
+    Blank or unknown grades become QC_MISSING.
+    """
+    if isinstance(values, pd.Series):
+        values = values.array
+    if isinstance(values, pd.Categorical):
+        return _categorical_lut(values, decode_profile_grades)
+
+    raw = _first_code_points(values)
+    if raw is None:
+        return np.full(np.shape(values), QC_MISSING, dtype=np.uint8)
+    raw = np.where((raw >= ord("a")) & (raw <= ord("f")), raw - 32, raw)
+    ok = (raw >= ord("A")) & (raw <= ord("F"))
+    return np.where(ok, raw, QC_MISSING).astype(np.uint8)
+
+
+# ---------- Policy ----------
+class QCPolicy:
+    """
+    Which QC flags / grades are accepted.
+
+    level_flags:    accepted per-level flags, either one iterable for all variables
+                    or a dict {"depth": (1, 2), "temperature": (1,), ...}
+    profile_grades: accepted profile grades, e.g. "AB"; None disables the profile rules.
+                    Also accepts a dict per variable.
+    accept_missing: whether blank/missing flag values pass (absent QC columns always pass)
+    variables:      which of depth/temperature/salinity the rules apply to
+    """
+
+    def __init__(self, level_flags=(1, 2), profile_grades=None, accept_missing=False, variables=MEASUREMENTS):
+        self.variables = tuple(variables)
+        self.accept_missing = accept_missing
+        self.level_flags = self._per_variable(level_flags)
+        self.profile_grades = self._per_variable(profile_grades) if profile_grades is not None else {}
+
+    def _per_variable(self, spec) -> dict:
+        if isinstance(spec, dict):
+            return {v: tuple(spec[v]) for v in self.variables if spec.get(v) is not None}
+        return {v: tuple(spec) for v in self.variables}
+
+    def _lut(self, accepted, as_grades=False) -> np.ndarray:
+        lut = np.zeros(256, dtype=bool)
+        codes = [ord(str(a).upper()) for a in accepted] if as_grades else [int(a) for a in accepted]
+        lut[codes] = True
+        lut[QC_MISSING] = self.accept_missing
+        return lut
+
+    def rules(self):
+        """(rule_name, kind, variable, lookup table) for every active rule."""
+        out = []
+        for var, flags in self.level_flags.items():
+            out.append((f"{var}_qc", "level", var, self._lut(flags)))
+        for var, grades in self.profile_grades.items():
+            out.append((f"profile_{ARGO_VARIABLES[var]}_qc", "profile", var, self._lut(grades, as_grades=True)))
+        return out
+
+    def __repr__(self) -> str:
+        return (f"QCPolicy(level_flags={self.level_flags}, profile_grades={self.profile_grades}, "
+                f"accept_missing={self.accept_missing})")
+
+
+class QCResult:
+    """Boolean keep-mask plus per-rule rejection counts (rules are counted independently)."""
+
+    def __init__(self, mask: np.ndarray, rejected: dict, skipped: list):
+        self.mask = mask
+        self.rejected = rejected
+        self.skipped = skipped
+
+    @property
+    def n_total(self) -> int:
+        return int(self.mask.size)
+
+    @property
+    def n_kept(self) -> int:
+        return int(np.count_nonzero(self.mask))
+
+    def summary(self, label: str = None) -> str:
+        per_rule = ", ".join(f"{k}: -{v}" for k, v in self.rejected.items()) or "no rules applied"
+        text = f"[INFO] {label + ': ' if label else ''}QC kept {self.n_kept}/{self.n_total} rows ({per_rule})"
+        if self.skipped:
+            text += f" | absent, skipped: {self.skipped}"
+        return text
+
+
+# ---------- Engine ----------
+def apply_qc(data, policy: QCPolicy = None, columns: dict = None) -> QCResult:
+    """
+    Evaluate a QCPolicy against a raw Argo DataFrame or a ProfileStore.
+
+    For a DataFrame the mask is per row; `columns` maps generic names to the measurement
+    columns whose `<col>_qc` flags are checked (resolved from the frame when omitted).
+    For a ProfileStore the mask is per level, and profile rules use the per-profile metadata.
+    """
+    policy = policy or QCPolicy()
+    is_store = hasattr(data, "offsets") and hasattr(data, "qc")
+    if is_store:
+        n = data.n_levels
+    else:
+        n = len(data)
+        columns = columns or resolve_argo_columns(data.columns)
+
+    mask = np.ones(n, dtype=bool)
+    rejected, skipped = {}, []
+    for name, kind, var, lut in policy.rules():
+        if kind == "level":
+            if is_store:
+                codes = data.qc.get(name)
+            else:
+                col = f"{columns[var]}_qc"
+                codes = decode_qc_flags(data[col]) if col in data.columns else None
+            ok = lut[codes] if codes is not None else None
+        else:
+            if is_store:
+                grades = data.meta.get(name)
+                # Evaluate once per profile, then broadcast to levels
+                ok = np.repeat(lut[decode_profile_grades(grades)], data.lengths) if grades is not None else None
+            else:
+                ok = lut[decode_profile_grades(data[name])] if name in data.columns else None
+
+        if ok is None:
+            skipped.append(name)
+            continue
+        rejected[name] = int(n - np.count_nonzero(ok))
+        mask &= ok
+
+    return QCResult(mask, rejected, skipped)
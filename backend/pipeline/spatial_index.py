@@ -0,0 +1,256 @@
+"""
+Nearest-neighbour lookup over profiles (position + time)
+- Profiles are embedded on the sphere as 3-D points (km); chord distance is monotonic in
+  great-circle (haversine) distance, so Euclidean KD-trees give haversine-correct neighbours
+- Time is a 4th axis scaled by km_per_day, for "nearest to this point and date" queries
+- Batch k-NN and radius queries; reported distances are exact haversine km and |Δt| days
+- Incremental: new profiles go to a small buffer that is searched by brute force and
+  merged into the trees once it grows past rebuild_fraction
+- Store IDs are positional (renumbered by ProfileStore.concat), so add_store() assigns IDs past
+  the current maximum and keeps (platform_number, cycle_number) per entry to map hits back to the data
+- Persisted with joblib alongside the data
+"""
+
+import os
+
+import joblib
+import numpy as np
+from sklearn.neighbors import KDTree
+
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_INDEX_NAME = "profile_index.pkl"
+
+
+# ---------- Geometry ----------
+def to_cartesian(lat, lon) -> np.ndarray:
+    lat, lon = np.radians(np.asarray(lat, dtype=np.float64)), np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return EARTH_RADIUS_KM * np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def _arc_to_chord(km):
+    arc = np.minimum(np.asarray(km, dtype=np.float64), np.pi * EARTH_RADIUS_KM)
+    return 2 * EARTH_RADIUS_KM * np.sin(arc / (2 * EARTH_RADIUS_KM))
+
+
+def _to_days(times) -> np.ndarray:
+    """datetime-like → float days since epoch (NaT → NaN)."""
+    t = np.asarray(times)
+    if t.dtype.kind == "M":
+        ns = t.astype("datetime64[ns]")
+        days = ns.view(np.int64) / 86_400e9
+        return np.where(np.isnat(ns), np.nan, days)
+    return t.astype(np.float64)
+
+
+# ---------- Index ----------
+class ProfileIndex:
+    """
+    k-NN / radius index over per-profile latitude, longitude and date_time.
+
+    km_per_day sets how many km of distance one day of time difference is worth
+    in space-time queries (e.g. 10 → 3 days apart ≈ 30 km apart).
+    """
+
+    def __init__(self, km_per_day: float = 10.0, rebuild_fraction: float = 0.1, leaf_size: int = 40):
+        self.km_per_day = km_per_day
+        self.rebuild_fraction = rebuild_fraction
+        self.leaf_size = leaf_size
+        self.latitude = np.empty(0)
+        self.longitude = np.empty(0)
+        self.days = np.empty(0)
+        self.profile_id = np.empty(0, dtype=np.int64)
+        self.platform_number = np.empty(0, dtype=object)
+        self.cycle_number = np.empty(0, dtype=np.int64)
+        self._n_indexed = 0
+        self._space_tree = None
+        self._spacetime_tree = None
+
+    # ---------- Build / update ----------
+    @classmethod
+    def from_store(cls, store, **kwargs) -> "ProfileIndex":
+        index = cls(**kwargs)
+        index.add_store(store)
+        return index
+
+    def add_store(self, store) -> np.ndarray:
+        """
+        Append a ProfileStore batch (e.g. one day's new files). Its positional profile IDs are
+        offset past the current maximum; profiles whose (platform_number, cycle_number) are
+        already indexed are skipped. Returns the IDs assigned to the store's profiles (-1 = skipped).
+        """
+        meta = store.meta
+        n = len(store)
+        platform = (np.asarray(meta["platform_number"], dtype=object).astype(str) if "platform_number" in meta
+                    else np.full(n, "", dtype=object))
+        cycle = np.asarray(meta["cycle_number"], dtype=np.int64) if "cycle_number" in meta else np.full(n, -1)
+        known = set(zip(self.platform_number[self.cycle_number >= 0], self.cycle_number[self.cycle_number >= 0]))
+        new = np.array([c < 0 or (p, c) not in known for p, c in zip(platform, cycle)], dtype=bool)
+        if not new.all():
+            print(f"[INFO] Skipping {int((~new).sum())} profiles already in the index")
+
+        base = int(self.profile_id.max()) + 1 if len(self) else 0
+        ids = np.full(n, -1, dtype=np.int64)
+        ids[new] = base + np.arange(int(new.sum()))
+        times = meta.get("date_time", np.full(n, np.datetime64("NaT"), dtype="datetime64[ns]"))
+        self.add(np.asarray(meta["latitude"])[new], np.asarray(meta["longitude"])[new], np.asarray(times)[new],
+                 ids[new], platform[new], cycle[new])
+        return ids
+
+    def stable_keys(self, profile_ids):
+        """profile IDs from a query → (platform_number, cycle_number) arrays (unknown / -1 → "", -1)."""
+        ids = np.asarray(profile_ids, dtype=np.int64)
+        lookup = dict(zip(self.profile_id.tolist(), range(len(self))))
+        pos = np.array([lookup.get(i, -1) for i in ids.ravel().tolist()], dtype=np.int64).reshape(ids.shape)
+        hit = pos >= 0
+        platform = np.where(hit, np.append(self.platform_number, "")[pos], "")
+        cycle = np.where(hit, np.append(self.cycle_number, -1)[pos], -1)
+        return platform, cycle
+
+    def __len__(self) -> int:
+        return self.profile_id.size
+
+    @property
+    def n_pending(self) -> int:
+        return len(self) - self._n_indexed
+
+    def _spacetime_points(self, lat, lon, days) -> np.ndarray:
+        # Profiles without a time sit at t=0; they are still found by spatial queries
+        t = np.nan_to_num(np.asarray(days, dtype=np.float64), nan=0.0) * self.km_per_day
+        return np.column_stack([to_cartesian(lat, lon), t])
+
+    def add(self, latitude, longitude, date_time, profile_id, platform_number=None, cycle_number=None):
+        """
+        Append profiles; they are searchable immediately and merged into the trees lazily.
+        profile_id must be unique across the whole index (see add_store for ProfileStore batches).
+        """
+        lat = np.asarray(latitude, dtype=np.float64)
+        lon = np.asarray(longitude, dtype=np.float64)
+        ids = np.asarray(profile_id, dtype=np.int64)
+        if np.unique(ids).size != ids.size or np.isin(ids, self.profile_id).any():
+            raise ValueError("profile_id values must be unique across the index; use add_store() for store batches")
+        n = ids.size
+        platform = np.asarray(platform_number, dtype=object) if platform_number is not None else np.full(n, "", dtype=object)
+        cycle = np.asarray(cycle_number, dtype=np.int64) if cycle_number is not None else np.full(n, -1, dtype=np.int64)
+        ok = np.isfinite(lat) & np.isfinite(lon)
+        self.latitude = np.r_[self.latitude, lat[ok]]
+        self.longitude = np.r_[self.longitude, lon[ok]]
+        self.days = np.r_[self.days, _to_days(date_time)[ok]]
+        self.profile_id = np.r_[self.profile_id, ids[ok]]
+        self.platform_number = np.r_[self.platform_number, platform[ok]]
+        self.cycle_number = np.r_[self.cycle_number, cycle[ok]]
+        if self.n_pending > self.rebuild_fraction * max(self._n_indexed, 1):
+            self.rebuild()
+
+    def rebuild(self):
+        """Rebuild both trees over every profile (clears the pending buffer)."""
+        if not len(self):
+            return
+        print(f"[INFO] Building profile index over {len(self)} profiles...")
+        self._space_tree = KDTree(to_cartesian(self.latitude, self.longitude), leaf_size=self.leaf_size)
+        self._spacetime_tree = KDTree(self._spacetime_points(self.latitude, self.longitude, self.days),
+                                      leaf_size=self.leaf_size)
+        self._n_indexed = len(self)
+
+    # ---------- Queries ----------
+    def _prepare(self, lat, lon, date_time):
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        if date_time is None:
+            return lat, lon, None, to_cartesian(lat, lon)
+        days = np.atleast_1d(_to_days(date_time))
+        return lat, lon, days, self._spacetime_points(lat, lon, days)
+
+    def query(self, latitude, longitude, date_time=None, k: int = 5):
+        """
+        k nearest profiles for a batch of points (optionally with dates → space-time neighbours).
+
+        Returns (profile_ids, distance_km, delta_days), each shaped (n_queries, k);
+        delta_days is None for spatial-only queries. Missing neighbours are -1 / NaN.
+        """
+        if not len(self):
+            raise ValueError("Index is empty")
+        lat, lon, days, points = self._prepare(latitude, longitude, date_time)
+        n_q = points.shape[0]
+        cand_pos, cand_dist = [], []
+
+        tree = self._space_tree if days is None else self._spacetime_tree
+        if tree is not None and self._n_indexed:
+            d, i = tree.query(points, k=min(k, self._n_indexed))
+            cand_pos.append(i); cand_dist.append(d)
+        if self.n_pending:
+            # Brute force over the (small) pending buffer
+            lo = self._n_indexed
+            buf = (to_cartesian(self.latitude[lo:], self.longitude[lo:]) if days is None
+                   else self._spacetime_points(self.latitude[lo:], self.longitude[lo:], self.days[lo:]))
+            d = np.linalg.norm(points[:, None, :] - buf[None, :, :], axis=2)
+            kk = min(k, d.shape[1])
+            i = np.argpartition(d, kk - 1, axis=1)[:, :kk]
+            cand_pos.append(i + lo); cand_dist.append(np.take_along_axis(d, i, axis=1))
+
+        pos = np.concatenate(cand_pos, axis=1)
+        dist = np.concatenate(cand_dist, axis=1)
+        order = np.argsort(dist, axis=1, kind="stable")[:, :k]
+        pos = np.take_along_axis(pos, order, axis=1)
+
+        ids = np.full((n_q, k), -1, dtype=np.int64)
+        km = np.full((n_q, k), np.nan)
+        dt = np.full((n_q, k), np.nan) if days is not None else None
+        w = pos.shape[1]
+        ids[:, :w] = self.profile_id[pos]
+        km[:, :w] = haversine_km(lat[:, None], lon[:, None], self.latitude[pos], self.longitude[pos])
+        if dt is not None:
+            dt[:, :w] = np.abs(self.days[pos] - days[:, None])
+        return ids, km, dt
+
+    def query_radius(self, latitude, longitude, radius_km: float, date_time=None, window_days: float = None):
+        """
+        All profiles within radius_km (great-circle) of each point, optionally within ±window_days.
+        Returns a list (one entry per query) of (profile_ids, distance_km) sorted by distance.
+        """
+        lat, lon, _, _ = self._prepare(latitude, longitude, None)
+        points = to_cartesian(lat, lon)
+        days = np.atleast_1d(_to_days(date_time)) if date_time is not None else None
+        chord = _arc_to_chord(radius_km)
+
+        hits = [np.empty(0, dtype=np.int64) for _ in range(len(lat))]
+        if self._space_tree is not None and self._n_indexed:
+            hits = list(self._space_tree.query_radius(points, r=chord))
+        if self.n_pending:
+            lo = self._n_indexed
+            d = np.linalg.norm(points[:, None, :] - to_cartesian(self.latitude[lo:], self.longitude[lo:])[None], axis=2)
+            for q in range(len(lat)):
+                hits[q] = np.r_[hits[q], np.flatnonzero(d[q] <= chord) + lo]
+
+        out = []
+        for q, pos in enumerate(hits):
+            pos = np.asarray(pos, dtype=np.int64)
+            if days is not None and window_days is not None:
+                pos = pos[np.abs(self.days[pos] - days[q]) <= window_days]
+            km = haversine_km(lat[q], lon[q], self.latitude[pos], self.longitude[pos])
+            order = np.argsort(km, kind="stable")
+            out.append((self.profile_id[pos[order]], km[order]))
+        return out
+
+    # ---------- Persistence ----------
+    def save(self, path: str):
+        """Persist next to the data, e.g. os.path.join(parquet_dir, DEFAULT_INDEX_NAME)."""
+        if os.path.isdir(path):
+            path = os.path.join(path, DEFAULT_INDEX_NAME)
+        joblib.dump(self, path)
+        print(f"[INFO] Saved profile index ({len(self)} profiles) to {path}")
+        return path
+
+    @staticmethod
+    def load(path: str) -> "ProfileIndex":
+        if os.path.isdir(path):
+            path = os.path.join(path, DEFAULT_INDEX_NAME)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"No profile index at {path}")
+        return joblib.load(path)